@@ -1,64 +1,404 @@
+import os
 import sys
 import time
 import json
+import math
 import numpy as np
 from time import time
+import argparse
+import resource
+import tracemalloc
+from functools import partial
+from contextlib import nullcontext
+from multiprocessing import Pool
+from array import array
 from heapq import heappop, heappush
+import PatternDatabase
+import MoveAutomaton
+from ResultStore import ResultStore, read_json_lines
+from SolutionCache import SolutionCache, DEFAULT_MAX_ENTRIES
+
+# Moves of the blank as (action, (row change, column change)), in the order they are tried
+ACTIONS = [('L', (0, -1)), ('R', (0, 1)), ('D', (1, 0)), ('U', (-1, 0))]
+# The move that undoes each move, used to prune immediate backtracking
+OPPOSITE = {'L': 'R', 'R': 'L', 'D': 'U', 'U': 'D'}
+
+def build_blank_moves(size=4):
+    """ For every blank position on a flat size x size board list the (action, new blank position) pairs """
+    blank_moves = []
+    for pos in range(size * size):
+        row, col = divmod(pos, size)
+        moves = []
+        for action, (dx, dy) in ACTIONS:
+            new_row, new_col = row + dx, col + dy
+            if 0 <= new_row < size and 0 <= new_col < size:
+                moves.append((action, new_row * size + new_col))
+        blank_moves.append(moves)
+    return blank_moves
+
+def build_successors(size=4):
+    """ For every blank position list the (action index, action, new blank position) triples, indexes are into ACTIONS """
+    index = {action: i for i, (action, _) in enumerate(ACTIONS)}
+    return [[(index[action], action, new_pos) for action, new_pos in moves] for moves in build_blank_moves(size)]
+
+def build_parent_automaton():
+    """ Move automaton that only prunes the move undoing the last one, its state is 1 + the index of the last action """
+    # Actions come in opposite pairs, so action ^ 1 undoes action
+    return [[1 + action for action in range(len(ACTIONS))]] + \
+        [[-1 if action == last ^ 1 else 1 + action for action in range(len(ACTIONS))] for last in range(len(ACTIONS))]
+
+# Move pruning automata by name, transitions indexed by state and action with -1 for a pruned move and 0 the start state.
+# Both only compare move sequences by their effect, so they hold on every board size.
+PRUNING = {
+    'parent': build_parent_automaton,
+    'fsm': MoveAutomaton.load_automaton,
+}
+
+def manhattan_distance(tile, pos, size=4):
+    """ Manhattan distance of a tile at flat position pos from its goal position """
+    if tile == 0:
+        return 0
+    row, col = divmod(pos, size)
+    goal_row, goal_col = divmod(tile - 1, size)
+    return abs(row - goal_row) + abs(col - goal_col)
+
+def build_manhattan_tables(size=4):
+    """ Precompute tile distances indexed [tile][pos] and the change when a tile moves, indexed [tile][from_pos][to_pos] """
+    cells = size * size
+    distance = [[manhattan_distance(tile, pos, size) for pos in range(cells)] for tile in range(cells)]
+    delta = [[[distance[tile][to_pos] - distance[tile][from_pos] for to_pos in range(cells)]
+              for from_pos in range(cells)]
+             for tile in range(cells)]
+    return distance, delta
+
+def build_line_codes(size=4):
+    """ Code every tile per line as its goal index along that line, or size when its goal is not on the line """
+    row_codes = [[size] * (size * size) for _ in range(size)]
+    column_codes = [[size] * (size * size) for _ in range(size)]
+    for tile in range(1, size * size):
+        goal_row, goal_col = divmod(tile - 1, size)
+        row_codes[goal_row][tile] = goal_col
+        column_codes[goal_col][tile] = goal_row
+    return row_codes, column_codes
+
+def build_line_conflicts(size=4):
+    """ Linear conflict penalty for every arrangement of codes along a line, indexed by the base size + 1 line key """
+    base = size + 1
+    conflicts = []
+    for key in range(base ** size):
+        goals = [(key // base ** (size - 1 - i)) % base for i in range(size)]
+        goals = [goal for goal in goals if goal != size]
+        # Tiles not in the longest increasing run must each leave the line and come back
+        longest = [1] * len(goals)
+        for i in range(len(goals)):
+            for j in range(i):
+                if goals[j] < goals[i]:
+                    longest[i] = max(longest[i], longest[j] + 1)
+        conflicts.append(2 * (len(goals) - max(longest, default=0)))
+    return conflicts
+
+def build_neighbour_array(size=4):
+    """ New blank position for every blank position and action index into ACTIONS, -1 where the move leaves the board """
+    neighbours = np.full((size * size, len(ACTIONS)), -1, dtype=np.int64)
+    for pos, moves in enumerate(build_blank_moves(size)):
+        for action, new_pos in moves:
+            neighbours[pos, [name for name, _ in ACTIONS].index(action)] = new_pos
+    return neighbours
+
+class BoardTables:
+    """ Move, distance and line conflict tables of one board size, built once per size by get_tables """
+    def __init__(self, size):
+        self.size = size
+        self.cells = size * size
+        # Bits every tile takes in a packed board, see pack_board
+        self.tile_bits = (self.cells - 1).bit_length()
+        self.goal = list(range(1, self.cells)) + [0]
+        self.blank_moves = build_blank_moves(size)
+        self.successors = build_successors(size)
+        self.manhattan_distance, self.manhattan_delta = build_manhattan_tables(size)
+        # Flat board positions of every row and every column, in order along the line
+        self.row_cells = [[row * size + col for col in range(size)] for row in range(size)]
+        self.column_cells = [[row * size + col for row in range(size)] for col in range(size)]
+        self.row_codes, self.column_codes = build_line_codes(size)
+        self.line_conflict = build_line_conflicts(size)
+        # NumPy forms of the tables, for evaluating an (N, cells) array of boards with gathers
+        self.positions = np.arange(self.cells)
+        self.manhattan_array = np.array(self.manhattan_distance, dtype=np.int64)
+        self.row_code_array = np.array(self.row_codes, dtype=np.int64)
+        self.column_code_array = np.array(self.column_codes, dtype=np.int64)
+        self.line_conflict_array = np.array(self.line_conflict, dtype=np.int64)
+        # Weights turning the codes of a line into its base size + 1 key
+        self.line_key_weights = (size + 1) ** np.arange(size - 1, -1, -1, dtype=np.int64)
+        self.neighbour_array = build_neighbour_array(size)
+
+# Tables by board size, shared by every heuristic and search of that size in a process
+board_tables = {}
+
+def get_tables(size=4):
+    """ The tables of a board size, built on first use """
+    if size not in board_tables:
+        board_tables[size] = BoardTables(size)
+    return board_tables[size]
+
+def pack_board(board, tile_bits=4):
+    """ Pack a flat board into one integer holding the tile at position pos in bits tile_bits * pos onwards """
+    state = 0
+    for pos, tile in enumerate(board):
+        state |= tile << (tile_bits * pos)
+    return state
+
+def unpack_state(state, cells=16, tile_bits=4):
+    """ Flat board of a packed state """
+    mask = (1 << tile_bits) - 1
+    return [(state >> (tile_bits * pos)) & mask for pos in range(cells)]
+
+def board_rows(board, size=4):
+    """ Rows of a flat board, the form puzzles are given to the engines in """
+    return [board[i:i+size] for i in range(0, len(board), size)]
+
+def is_solvable(board):
+    """ Whether a flat square board can reach the goal, by the parity of its inversions and, on even widths, its blank row """
+    size = math.isqrt(len(board))
+    tiles = [tile for tile in board if tile]
+    inversions = sum(1 for i in range(len(tiles)) for j in range(i + 1, len(tiles)) if tiles[i] > tiles[j])
+    if size % 2:
+        return inversions % 2 == 0
+    return (inversions + board.index(0) // size) % 2 == 1
+
+class Heuristic:
+    """ Base class for heuristics that evaluate a flat board of one size and update the value when one tile moves """
+    def __init__(self, size=4):
+        self.size = size
+        self.tables = get_tables(size)
+
+    def __reduce__(self):
+        # Worker processes rebuild the heuristic from its size instead of receiving the tables
+        return type(self), (self.size,)
+
+    def evaluate(self, board):
+        """ Heuristic value of a flat board """
+        raise NotImplementedError
+
+    def update(self, board, h, tile, from_pos, to_pos):
+        """ Heuristic value after tile moved from from_pos to to_pos, given the board after the move """
+        raise NotImplementedError
+
+    def update_packed(self, state, h, tile, from_pos, to_pos):
+        """ Heuristic value after a move, given the packed state after the move """
+        return self.update(unpack_state(state, self.tables.cells, self.tables.tile_bits), h, tile, from_pos, to_pos)
+
+    def evaluate_batch(self, boards):
+        """ Heuristic values of an (N, cells) array of flat boards """
+        return np.array([self.evaluate(board) for board in boards.tolist()], dtype=np.int64)
+
+class ManhattanHeuristic(Heuristic):
+    """ Sum of the Manhattan distances of every tile from its goal position """
+    def __init__(self, size=4):
+        super().__init__(size)
+        self.distance = self.tables.manhattan_distance
+        self.delta = self.tables.manhattan_delta
+
+    def evaluate(self, board):
+        distance = self.distance
+        return sum(distance[tile][pos] for pos, tile in enumerate(board))
+
+    def update(self, board, h, tile, from_pos, to_pos):
+        # Only the moved tile changes position so the heuristic is updated by its difference
+        return h + self.delta[tile][from_pos][to_pos]
+
+    def update_packed(self, state, h, tile, from_pos, to_pos):
+        # The board is not needed so the state is never unpacked
+        return h + self.delta[tile][from_pos][to_pos]
+
+    def evaluate_batch(self, boards):
+        return self.tables.manhattan_array[boards, self.tables.positions].sum(axis=1)
+
+class LinearConflictHeuristic(Heuristic):
+    """ Manhattan distance plus 2 for every tile that has to leave its goal row or column to let another pass
+
+    Unlike ManhattanDistancePlusLinearDistance in 15PuzzleSolver.cpp, which adds 2 for every conflicting
+    pair, a line only counts the tiles outside its longest run already in goal order, which keeps it admissible.
+    """
+    def __init__(self, size=4):
+        super().__init__(size)
+        tables = self.tables
+        self.distance = tables.manhattan_distance
+        self.delta = tables.manhattan_delta
+        self.conflicts = tables.line_conflict
+        self.base = size + 1
+        # For every move the lines whose conflicts can change, a horizontal move changes two columns
+        # and a vertical move changes two rows
+        self.move_lines = [[None] * tables.cells for _ in range(tables.cells)]
+        for blank in range(tables.cells):
+            for action, new_blank in tables.blank_moves[blank]:
+                (from_row, from_col), (to_row, to_col) = divmod(new_blank, size), divmod(blank, size)
+                if from_row == to_row:
+                    lines = [(tables.column_cells[from_col], tables.column_codes[from_col]),
+                             (tables.column_cells[to_col], tables.column_codes[to_col])]
+                else:
+                    lines = [(tables.row_cells[from_row], tables.row_codes[from_row]),
+                             (tables.row_cells[to_row], tables.row_codes[to_row])]
+                self.move_lines[new_blank][blank] = lines
+        # The 15-puzzle is the hot path, so its lines are keyed without a loop
+        if size == 4:
+            self.line_conflict = self.line_conflict_four
+
+    def line_conflict(self, board, cells, codes):
+        """ Look up the conflict penalty of one row or column """
+        key = 0
+        for cell in cells:
+            key = key * self.base + codes[board[cell]]
+        return self.conflicts[key]
+
+    def line_conflict_four(self, board, cells, codes):
+        """ line_conflict for lines of four cells """
+        a, b, c, d = cells
+        return self.conflicts[((codes[board[a]] * 5 + codes[board[b]]) * 5 + codes[board[c]]) * 5 + codes[board[d]]]
+
+    def evaluate(self, board):
+        tables = self.tables
+        h = sum(self.distance[tile][pos] for pos, tile in enumerate(board))
+        for line in range(self.size):
+            h += self.line_conflict(board, tables.row_cells[line], tables.row_codes[line])
+            h += self.line_conflict(board, tables.column_cells[line], tables.column_codes[line])
+        return h
+
+    def evaluate_batch(self, boards):
+        tables = self.tables
+        h = tables.manhattan_array[boards, tables.positions].sum(axis=1)
+        for line in range(self.size):
+            h += tables.line_conflict_array[tables.row_code_array[line][boards[:, tables.row_cells[line]]] @ tables.line_key_weights]
+            h += tables.line_conflict_array[tables.column_code_array[line][boards[:, tables.column_cells[line]]] @ tables.line_key_weights]
+        return h
+
+    def update(self, board, h, tile, from_pos, to_pos):
+        line_conflict = self.line_conflict
+        lines = self.move_lines[from_pos][to_pos]
+        new = sum(line_conflict(board, cells, codes) for cells, codes in lines)
+        # Briefly take the move back to read the conflicts of the same lines before it
+        board[from_pos], board[to_pos] = tile, 0
+        old = sum(line_conflict(board, cells, codes) for cells, codes in lines)
+        board[from_pos], board[to_pos] = 0, tile
+        return h + self.delta[tile][from_pos][to_pos] + new - old
+
+class PatternDatabaseHeuristic(Heuristic):
+    """ Sum of additive disjoint pattern database lookups, each table counting only moves of its own tiles, built for the 15-puzzle """
+    def __init__(self, partition='6-6-3', directory=PatternDatabase.DEFAULT_DIRECTORY, size=4):
+        if size != 4:
+            raise ValueError("Pattern databases are only built for the 15-puzzle")
+        super().__init__(size)
+        self.partition = partition
+        self.directory = directory
+        self.patterns = PatternDatabase.PARTITIONS[partition]
+        # Memory mapped tables, built and cached on disk the first time they are needed
+        self.databases = PatternDatabase.load_partition(partition, directory)
+        # For every tile the pattern it belongs to and the weight of its position in that pattern's index
+        self.tile_pattern = [None] * 16
+        self.tile_weight = [0] * 16
+        for pattern, tiles in enumerate(self.patterns):
+            for tile, weight in zip(tiles, PatternDatabase.pattern_weights(tiles)):
+                self.tile_pattern[tile] = pattern
+                self.tile_weight[tile] = weight
+
+    def __reduce__(self):
+        # Memory maps cannot be pickled, worker processes map the same files again instead
+        return PatternDatabaseHeuristic, (self.partition, self.directory)
+
+    def index(self, board, pattern):
+        """ Table index of one pattern's tiles on a flat board """
+        index = 0
+        for tile in self.patterns[pattern]:
+            index = index * 16 + board.index(tile)
+        return index
+
+    def evaluate(self, board):
+        return sum(table[self.index(board, pattern)] for pattern, table in enumerate(self.databases))
+
+    def evaluate_batch(self, boards):
+        # Boards are permutations, so sorting gives the position of every tile
+        positions = np.argsort(boards, axis=1)
+        h = np.zeros(len(boards), dtype=np.int64)
+        for tiles, table in zip(self.patterns, self.databases):
+            weights = np.array(PatternDatabase.pattern_weights(tiles), dtype=np.int64)
+            h += np.frombuffer(table, dtype=np.uint8)[positions[:, tiles] @ weights]
+        return h
+
+    def update(self, board, h, tile, from_pos, to_pos):
+        # Only the table of the moved tile's pattern changes, its old index differs by the tile's move
+        pattern = self.tile_pattern[tile]
+        table = self.databases[pattern]
+        index = self.index(board, pattern)
+        return h + table[index] - table[index - (to_pos - from_pos) * self.tile_weight[tile]]
+
+# Heuristics selectable by name, md and md_lc match MD.json and MD_LC.json
+HEURISTICS = {
+    'md': ManhattanHeuristic,
+    'md_lc': LinearConflictHeuristic,
+    'pdb555': partial(PatternDatabaseHeuristic, '5-5-5'),
+    'pdb663': partial(PatternDatabaseHeuristic, '6-6-3'),
+}
 
 class PuzzleNode:
-    def __init__(self, state, parent=None, action=None, path_cost=0):
+    @classmethod
+    def from_rows(cls, initial_state, heuristic_function):
+        """ Root node for a puzzle given as a list of rows """
+        return cls(initial_state, heuristic_function=heuristic_function)
+
+    def __init__(self, state, parent=None, action=None, path_cost=0, heuristic=None, heuristic_function=None):
         # Represents the current state of the puzzle
         self.state = state
+        # Heuristic used to evaluate this node, shared with the parent unless one is given
+        if heuristic_function is None:
+            heuristic_function = parent.heuristic_function if parent else ManhattanHeuristic(len(state))
+        self.heuristic_function = heuristic_function
         # Parent node which led to this state
         self.parent = parent
         # Action that led to this state
         self.action = action
         # Total path cost to reach this state
         self.path_cost = path_cost
-        # The goal state for 15-puzzle
-        self.goal = (np.arange(1, 17).reshape(4, 4) % 16).tolist()
-        # Heuristic value computed using Manhattan distance
-        self.heuristic = self.calculate_heuristic()
+        # Heuristic value, carried over from the parent when it is known
+        self.heuristic = self.calculate_heuristic() if heuristic is None else heuristic
         # f is the estimated total cost of the cheapest solution through this node
         self.f = self.path_cost + self.heuristic
 
     def calculate_heuristic(self):
-        """ Calculate Manhattan Distance for heuristic """
-        m_dist = 0
-        for i in range(4):
-            for j in range(4):
-                # Only calculate distance for tiles, not the empty space (0)
-                if self.state[i][j] != 0:
-                    # Determine the goal position for current tile
-                    goal_x, goal_y = divmod(self.state[i][j] - 1, 4)
-                    # Add the distance of current tile from its goal position
-                    m_dist += abs(i - goal_x) + abs(j - goal_y)
-        return m_dist
+        """ Evaluate the heuristic from scratch on the flattened state """
+        return self.heuristic_function.evaluate([num for row in self.state for num in row])
 
     def __lt__(self, other):
         # Custom less than operation for heap operations, based on f value
         return self.f < other.f
 
+    def key(self):
+        """ Hashable form of the state for the closed set """
+        return tuple(map(tuple, self.state))
+
     def generate_successors(self):
         """ Generate successor states by moving the empty tile """
         successors = []
-        actions = [('L', (0,-1)), ('R', (0, 1)), ('D', (1, 0)), ('U', (-1, 0))]
-        # Find the empty tile's coordinates
-        empty_x, empty_y = np.where(np.array(self.state) == 0)
-        empty_x, empty_y = int(empty_x), int(empty_y)
-
-        # Try to move the empty tile in all 4 directions
-        for action, (dx, dy) in actions:
-            # here dx represents the change to the first index into the matrix which is what row its in 
-            # and dy represents changing the column in that row
-            new_x, new_y = empty_x + dx, empty_y + dy
-            # Check for boundaries
-            if 0 <= new_x < 4 and 0 <= new_y < 4:
-                new_state = [row.copy() for row in self.state]
-                # Swap the empty tile with its neighboring tile
-                new_state[empty_x][empty_y], new_state[new_x][new_y] = new_state[new_x][new_y], new_state[empty_x][empty_y]
-                # Add the new state as a successor
-                successors.append(PuzzleNode(new_state, self, action, self.path_cost + 1))
+        board = [num for row in self.state for num in row]
+        blank = board.index(0)
+        size = len(self.state)
+        empty_x, empty_y = divmod(blank, size)
+        undo = OPPOSITE.get(self.action)
+
+        # Try every move the blank can make from its position, looked up instead of checking the boundaries
+        for _, action, new_blank in self.heuristic_function.tables.successors[blank]:
+            # Never undo the move that led here
+            if action == undo:
+                continue
+            new_x, new_y = divmod(new_blank, size)
+            new_state = [row.copy() for row in self.state]
+            tile = new_state[new_x][new_y]
+            # Swap the empty tile with its neighboring tile
+            new_state[empty_x][empty_y], new_state[new_x][new_y] = tile, 0
+            # Update the heuristic for the one tile that moved on a flat copy of the new state
+            new_board = board.copy()
+            new_board[blank], new_board[new_blank] = tile, 0
+            heuristic = self.heuristic_function.update(new_board, self.heuristic, tile, new_blank, blank)
+            # Add the new state as a successor
+            successors.append(PuzzleNode(new_state, self, action, self.path_cost + 1, heuristic))
 
         return successors
 
@@ -73,23 +413,680 @@ class PuzzleNode:
         # Reverse the actions to get them in order from root to this node
         return actions[::-1]
 
-def deepening_astar(initial_state):
-    """ Iterative deepening A* search for 15-puzzle """
+class PackedPuzzleNode:
+    """ Search node whose state is the whole board packed into one integer, see pack_board, with the tile bits of its size """
+    __slots__ = ('state', 'blank', 'parent', 'action', 'path_cost', 'heuristic', 'f', 'heuristic_function')
+
+    @classmethod
+    def from_rows(cls, initial_state, heuristic_function):
+        """ Root node for a puzzle given as a list of rows """
+        board = [num for row in initial_state for num in row]
+        return cls(pack_board(board, heuristic_function.tables.tile_bits), board.index(0), heuristic=heuristic_function.evaluate(board),
+                   heuristic_function=heuristic_function)
+
+    def __init__(self, state, blank, parent=None, action=None, path_cost=0, heuristic=None, heuristic_function=None):
+        # Packed board, an int so it is its own hash key
+        self.state = state
+        # Position of the blank, tracked so it never has to be searched for
+        self.blank = blank
+        # Heuristic used to evaluate this node, shared with the parent unless one is given
+        self.heuristic_function = heuristic_function if heuristic_function is not None else parent.heuristic_function
+        # Parent node which led to this state
+        self.parent = parent
+        # Action that led to this state
+        self.action = action
+        # Total path cost to reach this state
+        self.path_cost = path_cost
+        # Heuristic value, carried over from the parent when it is known
+        if heuristic is None:
+            tables = self.heuristic_function.tables
+            heuristic = self.heuristic_function.evaluate(unpack_state(state, tables.cells, tables.tile_bits))
+        self.heuristic = heuristic
+        # f is the estimated total cost of the cheapest solution through this node
+        self.f = path_cost + self.heuristic
+
+    def __lt__(self, other):
+        # Custom less than operation for heap operations, based on f value
+        return self.f < other.f
+
+    def key(self):
+        """ Hashable form of the state for the closed set """
+        return self.state
+
+    def generate_successors(self):
+        """ Generate successor states by sliding each neighbouring tile into the blank """
+        successors = []
+        state = self.state
+        blank = self.blank
+        update_packed = self.heuristic_function.update_packed
+        tables = self.heuristic_function.tables
+        bits = tables.tile_bits
+        mask = (1 << bits) - 1
+        undo = OPPOSITE.get(self.action)
+        for _, action, new_blank in tables.successors[blank]:
+            # Never undo the move that led here
+            if action == undo:
+                continue
+            shift = bits * new_blank
+            tile = (state >> shift) & mask
+            # Clear the tile's old position and set it on the blank's, whose bits are already zero
+            new_state = state ^ (tile << shift) | (tile << (bits * blank))
+            heuristic = update_packed(new_state, self.heuristic, tile, new_blank, blank)
+            successors.append(PackedPuzzleNode(new_state, new_blank, self, action, self.path_cost + 1, heuristic))
+        return successors
+
+    def solution(self):
+        """ Trace back from this node to root to get the solution """
+        actions = []
+        node = self
+        while node.parent:
+            actions.append(node.action)
+            node = node.parent
+        return actions[::-1]
+
+class TranspositionTable:
+    """ Fixed size table of the smallest g each packed state was reached with, kept across bounds
+
+    The table holds as many slots as fit in memory_budget bytes. Under the 'depth' policy each state
+    has one slot and a colliding entry is replaced only by one nearer the root, whose subtree is larger.
+    Under 'two_tier' each bucket has a slot kept that way and a second slot that always takes the newest entry.
+    """
+    # Bytes per slot, an 8 byte key, a 1 byte g and a 2 byte iteration
+    SLOT_BYTES = 11
+    POLICIES = ('depth', 'two_tier')
+
+    def __init__(self, memory_budget, policy='depth'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown replacement policy {policy}")
+        self.two_tier = policy == 'two_tier'
+        self.buckets = max(1, memory_budget // (self.SLOT_BYTES * (2 if self.two_tier else 1)))
+        slots = self.buckets * (2 if self.two_tier else 1)
+        # Packed states, 0 marks an empty slot since no board packs to 0
+        self.keys = array('Q', bytes(8 * slots))
+        self.g = array('B', bytes(slots))
+        # Bound iteration each entry was last reached in
+        self.iteration = array('H', bytes(2 * slots))
+        self.lookups = 0
+        self.hits = 0
+        self.pruned = 0
+        self.replacements = 0
+
+    def visit(self, key, g, iteration):
+        """ Record reaching key at g, returning True when the path is a duplicate and can be pruned
+
+        A path is a duplicate when the state was reached with a smaller g, or with the same g earlier in the same bound.
+        """
+        self.lookups += 1
+        keys = self.keys
+        slot = key % self.buckets
+        if self.two_tier:
+            slot *= 2
+            if keys[slot] != key and keys[slot + 1] == key:
+                slot += 1
+        if keys[slot] == key:
+            self.hits += 1
+            stored = self.g[slot]
+            if stored < g or (stored == g and self.iteration[slot] == iteration):
+                self.pruned += 1
+                return True
+            self.g[slot] = g
+            self.iteration[slot] = iteration
+            return False
+
+        if keys[slot] == 0 or g <= self.g[slot]:
+            if keys[slot] != 0:
+                self.replacements += 1
+                if self.two_tier:
+                    # The displaced entry moves to the always replaced slot
+                    keys[slot + 1], self.g[slot + 1], self.iteration[slot + 1] = keys[slot], self.g[slot], self.iteration[slot]
+        elif self.two_tier:
+            slot += 1
+            if keys[slot] != 0:
+                self.replacements += 1
+        else:
+            return False
+        keys[slot] = key
+        self.g[slot] = g
+        self.iteration[slot] = iteration
+        return False
+
+    def stats(self):
+        """ Lookup counts and the hit rate, for tuning the memory budget """
+        return {
+            "slots": len(self.keys),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "pruned": self.pruned,
+            "replacements": self.replacements,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+        }
+
+def resident_memory():
+    """ Current resident set size of this process in bytes, or its peak where /proc is not available """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class SearchStats:
+    """ Per bound statistics of one search, filled in between bounds so the per node cost does not change
+
+    memory is 'rss' to sample the resident set size after every bound, or 'tracemalloc' to trace every
+    Python allocation, which gives the exact peak of the search at a large slowdown.
+    """
+    MEMORY_SOURCES = ('rss', 'tracemalloc')
+
+    def __init__(self, memory='rss'):
+        if memory not in self.MEMORY_SOURCES:
+            raise ValueError(f"Unknown memory source {memory}")
+        self.memory = memory
+        self.iterations = []
+        self.peak_memory = 0
+        # Engine specific counts of the whole run, such as evictions of the memory bounded engine
+        self.counters = {}
+        # Proven lower bound on the optimal solution length, set by engines that may return longer solutions
+        self.lower_bound = None
+        # Node counts of the whole run at the end of the last bound
+        self.total_generated = 0
+        self.total_expanded = 0
+        self.started_tracing = False
+        if memory == 'tracemalloc':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            self.memory_baseline = tracemalloc.get_traced_memory()[0]
+        self.iteration_start = time()
+
+    def sample_memory(self):
+        """ Raise the peak to the current memory use, tracemalloc keeps its own peak between samples """
+        if self.memory == 'tracemalloc':
+            current = tracemalloc.get_traced_memory()[1] - self.memory_baseline
+        else:
+            current = resident_memory()
+        self.peak_memory = max(self.peak_memory, current)
+
+    def end_iteration(self, bound, nodes_generated, nodes_expanded):
+        """ Record a finished bound given the node counts of the whole run so far
+
+        The effective branching factor is the growth in generated nodes over the previous bound, per unit of bound
+        when the bound grew by at least one and as a plain ratio for the fractional steps of weighted bounds.
+        """
+        now = time()
+        generated = nodes_generated - self.total_generated
+        expanded = nodes_expanded - self.total_expanded
+        branching_factor = None
+        if self.iterations:
+            previous = self.iterations[-1]
+            if previous["nodes_generated"] and bound > previous["bound"]:
+                growth = generated / previous["nodes_generated"]
+                step = bound - previous["bound"]
+                try:
+                    branching_factor = growth ** (1 / step) if step >= 1 else growth
+                except OverflowError:
+                    branching_factor = None
+        self.iterations.append({
+            "bound": bound,
+            "nodes_generated": generated,
+            "nodes_expanded": expanded,
+            "branching_factor": branching_factor,
+            "elapsed_seconds": now - self.iteration_start,
+        })
+        self.total_generated = nodes_generated
+        self.total_expanded = nodes_expanded
+        self.sample_memory()
+        self.iteration_start = now
+
+    def finish(self):
+        """ Take the last memory sample and stop tracing if this search started it """
+        self.sample_memory()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def as_dict(self):
+        """ Statistics in the form written next to each solution """
+        return {
+            "peak_memory_bytes": self.peak_memory,
+            "memory_source": self.memory,
+            "iterations": self.iterations,
+            "counters": self.counters,
+        }
+
+class DepthFirstSearch:
+    """ Depth-first IDA* that makes and undoes moves on a single flat board and keeps only the current path """
+    def __init__(self, initial_state, heuristic_function, table=None, automaton=None):
+        # Heuristic evaluated on the board and updated after every move
+        self.heuristic_function = heuristic_function
+        tables = heuristic_function.tables
+        if len(initial_state) != tables.size:
+            raise ValueError(f"A {len(initial_state)} row board needs a heuristic for that size, not for {tables.size} rows")
+        if table is not None and tables.cells * tables.tile_bits > 64:
+            raise ValueError("Packed boards of this size do not fit the 64 bit keys of the transposition table")
+        # Moves of the blank and bits per packed tile for the board's size
+        self.successors = tables.successors
+        self.tile_bits = tables.tile_bits
+        # Transitions of the move pruning automaton, see PRUNING
+        self.automaton = automaton if automaton is not None else get_automaton('parent')
+        # Optional transposition table used to prune duplicate paths
+        self.table = table
+        # Number of the current bound iteration, for the transposition table
+        self.iteration = 0
+        # Flat board that every move is applied to and undone on
+        self.board = [num for row in initial_state for num in row]
+        # Position of the blank in the flat board
+        self.blank = self.board.index(0)
+        # Packed form of the board, kept up to date as the transposition table key
+        self.key = pack_board(self.board, self.tile_bits)
+        # Actions from the root to the node currently being searched
+        self.path = []
+        # Deepest g value reached during the search
+        self.max_depth = 0
+        self.heuristic = heuristic_function.evaluate(self.board)
+        # Number of nodes visited, counted the same way as nodesExpanded in 15PuzzleSolver.cpp
+        self.nodes_expanded = 0
+        # Number of nodes whose successors were generated
+        self.expansions = 0
+
+    def search(self, g, h, bound, state):
+        """ Search below the current board reached in automaton state, returning True when solved, otherwise the smallest f exceeding bound """
+        self.nodes_expanded += 1
+        if g > self.max_depth:
+            self.max_depth = g
+        f = g + h
+        if f > bound:
+            return f
+        if h == 0:
+            return True
+        if self.table is not None and self.table.visit(self.key, g, self.iteration):
+            return float('inf')
+        self.expansions += 1
+
+        board = self.board
+        blank = self.blank
+        update = self.heuristic_function.update
+        bits = self.tile_bits
+        transitions = self.automaton[state]
+        minimum = float('inf')
+        for index, action, new_blank in self.successors[blank]:
+            # The automaton rejects the move undoing the last one and, with fsm pruning, moves completing a duplicate sequence
+            next_state = transitions[index]
+            if next_state < 0:
+                continue
+            tile = board[new_blank]
+            # Make the move
+            board[blank], board[new_blank] = tile, 0
+            new_h = update(board, h, tile, new_blank, blank)
+            moved = (tile << (bits * new_blank)) | (tile << (bits * blank))
+            self.key ^= moved
+            self.blank = new_blank
+            self.path.append(action)
+
+            t = self.search(g + 1, new_h, bound, next_state)
+            if t is True:
+                return True
+
+            # Undo the move
+            self.path.pop()
+            self.key ^= moved
+            self.blank = blank
+            board[blank], board[new_blank] = 0, tile
+            if t < minimum:
+                minimum = t
+        return minimum
+
+def depth_first_astar(initial_state, heuristic_function, table=None, stats=None, pruning='parent'):
+    """ Iterative deepening A* for 15-puzzle using a recursive depth-first search for each bound """
+    start_time = time()
+    stats = stats if stats is not None else SearchStats()
+    search = DepthFirstSearch(initial_state, heuristic_function, table, get_automaton(pruning))
+
+    # Start with heuristic of root as initial bound
+    bound = search.heuristic
+    while True:
+        search.iteration += 1
+        t = search.search(0, search.heuristic, bound, 0)
+        stats.end_iteration(bound, search.nodes_expanded, search.expansions)
+        if t is True:
+            stats.finish()
+            return list(search.path), search.max_depth, time() - start_time, stats.peak_memory, search.nodes_expanded
+        # If no node exceeded the bound, it means there's no solution
+        if t == float('inf'):
+            stats.finish()
+            return None, search.max_depth, time() - start_time, stats.peak_memory, search.nodes_expanded
+        bound = t
+
+# Weight of the heuristic in weighted searches unless another is given
+WEIGHT = 2.0
+# Nodes visited between checks of the time and node limits of weighted searches
+CHECK_INTERVAL = 4096
+
+class BudgetExhausted(Exception):
+    """ Raised inside a weighted search when its time or node limit runs out """
+
+class WeightedDepthFirstSearch(DepthFirstSearch):
+    """ Depth-first search ordering nodes by g + weight * h, pruning nodes that cannot beat cost_limit and stopping at a deadline or node limit
+
+    Kept apart from DepthFirstSearch so the optimal search pays nothing for the extra checks.
+    """
+    def __init__(self, initial_state, heuristic_function, table=None, automaton=None, deadline=None, max_nodes=None):
+        super().__init__(initial_state, heuristic_function, table, automaton)
+        # Starting board, restored before every pass since a solved search stops on the goal
+        self.initial_board = list(self.board)
+        self.weight = WEIGHT
+        # Length a solution must stay under, the length of the best solution found so far
+        self.cost_limit = float('inf')
+        self.deadline = deadline
+        self.max_nodes = max_nodes
+        # Node count at which the limits are checked next
+        self.checkpoint = min(CHECK_INTERVAL, max_nodes or CHECK_INTERVAL)
+
+    def check_budget(self):
+        if self.max_nodes is not None and self.nodes_expanded >= self.max_nodes:
+            raise BudgetExhausted
+        if self.deadline is not None and time() >= self.deadline:
+            raise BudgetExhausted
+        self.checkpoint = self.nodes_expanded + CHECK_INTERVAL
+        if self.max_nodes is not None:
+            self.checkpoint = min(self.checkpoint, self.max_nodes)
+
+    def search(self, g, h, bound, state):
+        """ Search below the current board as DepthFirstSearch.search does, with weighted f values """
+        self.nodes_expanded += 1
+        if self.nodes_expanded >= self.checkpoint:
+            self.check_budget()
+        if g > self.max_depth:
+            self.max_depth = g
+        if g + h >= self.cost_limit:
+            return float('inf')
+        f = g + self.weight * h
+        if f > bound:
+            return f
+        if h == 0:
+            return True
+        if self.table is not None and self.table.visit(self.key, g, self.iteration):
+            return float('inf')
+        self.expansions += 1
+
+        board = self.board
+        blank = self.blank
+        update = self.heuristic_function.update
+        bits = self.tile_bits
+        transitions = self.automaton[state]
+        minimum = float('inf')
+        for index, action, new_blank in self.successors[blank]:
+            next_state = transitions[index]
+            if next_state < 0:
+                continue
+            tile = board[new_blank]
+            # Make the move
+            board[blank], board[new_blank] = tile, 0
+            new_h = update(board, h, tile, new_blank, blank)
+            moved = (tile << (bits * new_blank)) | (tile << (bits * blank))
+            self.key ^= moved
+            self.blank = new_blank
+            self.path.append(action)
+
+            t = self.search(g + 1, new_h, bound, next_state)
+            if t is True:
+                return True
+
+            # Undo the move
+            self.path.pop()
+            self.key ^= moved
+            self.blank = blank
+            board[blank], board[new_blank] = 0, tile
+            if t < minimum:
+                minimum = t
+        return minimum
+
+    def solve(self, weight, cost_limit, stats):
+        """ Weighted IDA* for a solution shorter than cost_limit, returning (moves or None, proven lower bound on the optimal length)
+
+        A solution found is at most weight times the optimal length. Once a bound fails every path whose
+        weighted f stays within it was searched, and an optimal path has f at most weight times the optimal
+        length, so the optimal length exceeds bound / weight unless it equals cost_limit. When every bound
+        fails no solution is shorter than cost_limit.
+        """
+        self.board = list(self.initial_board)
+        self.blank = self.board.index(0)
+        self.key = pack_board(self.board, self.tile_bits)
+        self.path = []
+        self.weight = weight
+        self.cost_limit = cost_limit
+        lower_bound = self.heuristic
+        bound = weight * self.heuristic
+        while True:
+            self.iteration += 1
+            t = self.search(0, self.heuristic, bound, 0)
+            stats.end_iteration(bound, self.nodes_expanded, self.expansions)
+            if t is True:
+                return list(self.path), lower_bound
+            if t == float('inf'):
+                return None, cost_limit
+            # The small margin keeps rounding in bound / weight from claiming too much
+            lower_bound = max(lower_bound, min(cost_limit, math.floor(bound / weight - 1e-9) + 1))
+            bound = t
+
+def weighted_astar(initial_state, heuristic_function, weight=WEIGHT, anytime=False, time_limit=None, max_nodes=None,
+                   table=None, stats=None, pruning='parent'):
+    """ Weighted IDA* returning a solution at most weight times the optimal length, stopping after time_limit seconds or max_nodes nodes
+
+    With anytime set the search keeps going after the first solution, halving the excess weight on every
+    pass and only looking for shorter solutions, until a pass at weight 1 or one finding nothing shorter
+    proves the best optimal or a limit runs out. The proven lower bound on the optimal length is left in
+    stats.lower_bound, rounded up to the parity every solution of the puzzle shares.
+    """
+    start_time = time()
+    stats = stats if stats is not None else SearchStats()
+    deadline = start_time + time_limit if time_limit else None
+    search = WeightedDepthFirstSearch(initial_state, heuristic_function, table, get_automaton(pruning), deadline, max_nodes)
+    best = None
+    lower_bound = search.heuristic
+    stats.counters["solutions"] = 0
+    try:
+        while True:
+            solution, proven = search.solve(weight, len(best) if best is not None else float('inf'), stats)
+            lower_bound = max(lower_bound, proven)
+            if solution is None:
+                break
+            best = solution
+            stats.counters["solutions"] += 1
+            if not anytime or weight <= 1 or len(best) <= lower_bound:
+                break
+            weight = 1 + (weight - 1) / 2 if weight > 1.125 else 1
+    except BudgetExhausted:
+        stats.counters["budget_exhausted"] = 1
+    stats.counters["final_weight"] = weight
+    if best is not None:
+        lower_bound = min(lower_bound, len(best))
+        # Every solution of a puzzle has the same parity of length, so an odd gap is one move too small
+        lower_bound += (len(best) - lower_bound) % 2
+        if weight <= 1 and "budget_exhausted" not in stats.counters:
+            lower_bound = len(best)
+    stats.lower_bound = lower_bound
+    stats.finish()
+    return best, search.max_depth, time() - start_time, stats.peak_memory, search.nodes_expanded
+
+# Moves from the root after which the parallel engine hands subtrees to the workers
+SPLIT_DEPTH = 8
+# Heuristic and move pruning automaton of a parallel engine worker process, set when the pool starts
+worker_heuristic = None
+worker_automaton = None
+
+def set_worker_heuristic(heuristic_function, automaton=None):
+    """ Pool initializer storing the heuristic and automaton for search_subtree """
+    global worker_heuristic, worker_automaton
+    worker_heuristic = heuristic_function
+    worker_automaton = automaton
+
+def search_subtree(task):
+    """ Depth-first search below one frontier node, run in a worker process of parallel_astar """
+    board, g, h, path, state, bound = task
+    search = DepthFirstSearch(board_rows(board, worker_heuristic.size), worker_heuristic, automaton=worker_automaton)
+    t = search.search(g, h, bound, state)
+    # The frontier node itself was already counted by split_frontier
+    return t, path + search.path, search.nodes_expanded - 1, search.expansions, max(search.max_depth, g)
+
+def expand_batch(boards, blanks, states, g, heuristic_function, bound, transitions):
+    """ Generate the children of an (N, cells) array of boards at depth g and drop those over bound in bulk
+
+    states holds the move pruning automaton state of every board and transitions the automaton as an array.
+    Returns the children within bound as boards, blanks, heuristics, automaton states, action indexes and
+    parent rows, then the number of children generated and the smallest f exceeding bound.
+    """
+    children, new_blanks, new_states, actions, parents = [], [], [], [], []
+    for action in range(len(ACTIONS)):
+        new_blank = heuristic_function.tables.neighbour_array[blanks, action]
+        next_state = transitions[states, action]
+        rows = np.nonzero((new_blank >= 0) & (next_state >= 0))[0]
+        child = boards[rows]
+        index = np.arange(len(rows))
+        child[index, blanks[rows]] = child[index, new_blank[rows]]
+        child[index, new_blank[rows]] = 0
+        children.append(child)
+        new_blanks.append(new_blank[rows])
+        new_states.append(next_state[rows])
+        actions.append(np.full(len(rows), action))
+        parents.append(rows)
+    children = np.concatenate(children)
+    new_blanks = np.concatenate(new_blanks)
+    new_states = np.concatenate(new_states)
+    actions = np.concatenate(actions)
+    parents = np.concatenate(parents)
+
+    h = heuristic_function.evaluate_batch(children)
+    f = g + 1 + h
+    within = f <= bound
+    minimum = int(f[~within].min()) if not within.all() else float('inf')
+    return (children[within], new_blanks[within], h[within], new_states[within], actions[within], parents[within],
+            len(children), minimum)
+
+def split_frontier(board, heuristic_function, bound, split_depth, automaton):
+    """ Expand the root breadth first to split_depth within bound, removing duplicate states at each depth
+
+    Every depth is expanded as one NumPy batch. Returns the solution if one is found above the split
+    depth, otherwise the frontier as (board, h, path, automaton state) entries, then the nodes visited,
+    the nodes expanded and the smallest f exceeding bound.
+    """
+    boards = np.array([board], dtype=np.uint8)
+    h = heuristic_function.evaluate_batch(boards)
+    if h[0] > bound:
+        return None, [], 1, 0, int(h[0])
+    if h[0] == 0:
+        return [], None, 1, 0, float('inf')
+    blanks = np.array([board.index(0)])
+    states = np.array([0])
+    transitions = np.array(automaton)
+    # Action index and parent row of every kept board, one pair of arrays per depth
+    levels = []
+
+    def path_of(row):
+        path = []
+        for level_actions, level_parents in reversed(levels):
+            path.append(ACTIONS[level_actions[row]][0])
+            row = level_parents[row]
+        return path[::-1]
+
+    nodes_expanded = 1
+    expansions = 0
+    minimum = float('inf')
+    for g in range(split_depth):
+        expansions += len(boards)
+        boards, blanks, h, states, actions, parents, generated, exceeded = expand_batch(boards, blanks, states, g, heuristic_function,
+                                                                                      bound, transitions)
+        minimum = min(minimum, exceeded)
+        # Children over the bound are visited once each, like in the depth-first search
+        nodes_expanded += generated - len(boards)
+        # Order by parent then action as a depth-first search meets them, then keep the first copy of every state,
+        # whose path is the one the move pruning automaton relies on
+        order = np.lexsort((actions, parents))
+        # Each board's bytes compared as one value, whatever the board size
+        keys = np.ascontiguousarray(boards[order]).view(np.dtype((np.void, boards.shape[1])))[:, 0]
+        keep = order[np.sort(np.unique(keys, return_index=True)[1])]
+        boards, blanks, h, states, actions, parents = boards[keep], blanks[keep], h[keep], states[keep], actions[keep], parents[keep]
+        nodes_expanded += len(boards)
+        levels.append((actions, parents))
+        goals = np.nonzero(h == 0)[0]
+        if goals.size:
+            return path_of(goals[0]), None, nodes_expanded, expansions, minimum
+        if not len(boards):
+            break
+    frontier = [(boards[row].tolist(), int(h[row]), path_of(row), int(states[row])) for row in range(len(boards))]
+    return None, frontier, nodes_expanded, expansions, minimum
+
+def parallel_astar(initial_state, heuristic_function, workers=None, split_depth=SPLIT_DEPTH, stats=None, pruning='parent'):
+    """ Iterative deepening A* for one 15-puzzle that searches the subtrees below a split depth on a process pool
+
+    Every bound expands the root to split_depth and hands the deduplicated frontier to the workers,
+    which return the smallest f exceeding the bound. The bound stops early once a worker finds a solution.
+    Nodes above and below the split are each counted once, so every bound that ends without a solution
+    counts the nodes depth_first_astar does, as long as split_depth is too shallow for two paths to reach
+    one state. Deeper splits count each state removed as a duplicate once less.
+    """
     start_time = time()
-    memory_usage = sys.getsizeof(initial_state)
+    stats = stats if stats is not None else SearchStats()
+    board = [num for row in initial_state for num in row]
+    nodes_expanded = 0
+    expansions = 0
+    max_depth = 0
+
+    automaton = get_automaton(pruning)
+    bound = heuristic_function.evaluate(board)
+    with Pool(workers, initializer=set_worker_heuristic, initargs=(heuristic_function, automaton)) as pool:
+        while True:
+            solution, frontier, nodes, expanded, minimum = split_frontier(board, heuristic_function, bound, split_depth, automaton)
+            nodes_expanded += nodes
+            expansions += expanded
+            if solution is not None:
+                stats.end_iteration(bound, nodes_expanded, expansions)
+                stats.finish()
+                return solution, len(solution), time() - start_time, stats.peak_memory, nodes_expanded
+            max_depth = max(max_depth, split_depth if frontier else 0)
+
+            tasks = [(board, split_depth, h, path, state, bound) for board, h, path, state in frontier]
+            for t, path, nodes, expanded, depth in pool.imap_unordered(search_subtree, tasks):
+                nodes_expanded += nodes
+                expansions += expanded
+                max_depth = max(max_depth, depth)
+                if t is True:
+                    stats.end_iteration(bound, nodes_expanded, expansions)
+                    stats.finish()
+                    # Leaving the pool stops the workers still searching other subtrees
+                    return path, max_depth, time() - start_time, stats.peak_memory, nodes_expanded
+                minimum = min(minimum, t)
+            stats.end_iteration(bound, nodes_expanded, expansions)
 
-    root = PuzzleNode(initial_state)
+            # If no node exceeded the bound, it means there's no solution
+            if minimum == float('inf'):
+                stats.finish()
+                return None, max_depth, time() - start_time, stats.peak_memory, nodes_expanded
+            bound = minimum
+
+def heap_astar(initial_state, heuristic_function, node_class=PuzzleNode, stats=None):
+    """ Iterative deepening search for 15-puzzle that runs a heap-ordered best-first search for each bound """
+    start_time = time()
+    stats = stats if stats is not None else SearchStats()
+    nodes_expanded = 0
+    nodes_generated = 1
+    expansions = 0
+
+    root = node_class.from_rows(initial_state, heuristic_function)
     
     # Check if initial state is already a goal state
     if root.heuristic == 0:
-        return root.solution(),0,time() - start_time, memory_usage
+        stats.finish()
+        return root.solution(),0,time() - start_time, stats.peak_memory, nodes_expanded
 
     # Start with heuristic of root as initial bound
     bound = root.heuristic
 
     while True:
         open_list = [root]
-        closed_set = set()
+        # Smallest g every state has been generated with in this bound
+        closed_set = {root.key(): 0}
         found = None
         next_bound = float('inf')  # set to infinity initially
         depth = 0 
@@ -97,8 +1094,11 @@ def deepening_astar(initial_state):
         # Main search loop
         while open_list:
             current = heappop(open_list)
+            # Skip copies left behind when the state was pushed again with a smaller g
+            if current.path_cost > closed_set[current.key()]:
+                continue
+            nodes_expanded += 1
             depth = max(depth,current.path_cost)
-            memory_usage = max(memory_usage,sys.getsizeof(open_list))
             
             # If the current state is a goal state
             if current.heuristic == 0:
@@ -111,61 +1111,416 @@ def deepening_astar(initial_state):
                 continue
 
             # Expand the current node and add its successors to the open list
+            expansions += 1
             for successor in current.generate_successors():
-                hashable_state = tuple(map(tuple, successor.state))
-                if hashable_state not in closed_set:
+                hashable_state = successor.key()
+                # A state reached again by a shorter path is pushed again, otherwise the first path could hide the optimal one
+                if successor.path_cost < closed_set.get(hashable_state, float('inf')):
+                    nodes_generated += 1
                     heappush(open_list, successor)
-                    closed_set.add(hashable_state)
+                    closed_set[hashable_state] = successor.path_cost
                     #show_grid(np.array(successor.state), ax, text_objects)
 
+        # Sampled while the open list and closed set of this bound are still alive
+        stats.end_iteration(bound, nodes_generated, expansions)
+        # The next bound starts again from the root
+        nodes_generated += 1
+
         # If a solution was found
         if found:
-            return found.solution(), depth, time() - start_time, memory_usage
+            stats.finish()
+            return found.solution(), depth, time() - start_time, stats.peak_memory, nodes_expanded
 
         # If no node exceeded the bound, it means there's no solution
         if next_bound == float('inf'):  # if next_bound remains unchanged
-            return None, depth,time()-start_time,memory_usage
+            stats.finish()
+            return None, depth,time()-start_time,stats.peak_memory, nodes_expanded
 
         # Update the bound for the next iteration
         bound = next_bound
 
-def read_puzzles_from_file(filename):
+# Approximate bytes held per node by the best-first phase of bounded_astar, a PackedPuzzleNode with its closed set entry and heap slot
+NODE_BYTES = 200
+# Nodes bounded_astar keeps when no budget is given
+NODE_BUDGET = 1000000
+
+def bounded_astar(initial_state, heuristic_function, node_budget=None, memory_budget=None, stats=None):
+    """ A* holding at most a node budget, falling back to iterative deepening below its frontier once the budget is spent
+
+    memory_budget in bytes is turned into a node budget with NODE_BYTES, the smaller budget wins. The
+    best-first phase reopens states reached by a shorter path, so every optimal solution passes an open
+    node holding its optimal g. When the closed set outgrows the budget it is evicted and only the open
+    nodes are kept, then each bound searches depth first below the open nodes within it, starting from
+    their smallest f, so the solution is still optimal. Evictions and the nodes generated again by later
+    bounds are counted in stats.counters.
+    """
+    start_time = time()
+    stats = stats if stats is not None else SearchStats()
+    budgets = [budget for budget in (node_budget, memory_budget and memory_budget // NODE_BYTES) if budget]
+    budget = min(budgets) if budgets else NODE_BUDGET
+    counters = stats.counters
+    counters.update(node_budget=budget, evictions=0, evicted_nodes=0, regenerated_nodes=0)
+    nodes_expanded = 0
+    nodes_generated = 1
+    expansions = 0
+    depth = 0
+
+    root = PackedPuzzleNode.from_rows(initial_state, heuristic_function)
+    open_list = [root]
+    # Smallest g every state has been generated with
+    closed_set = {root.state: 0}
+    bound = root.f
+    while open_list and len(closed_set) < budget:
+        current = heappop(open_list)
+        # Skip copies left behind when the state was pushed again with a smaller g
+        if current.path_cost > closed_set[current.state]:
+            continue
+        nodes_expanded += 1
+        depth = max(depth, current.path_cost)
+        # The largest f popped so far, reported as the bound of the best-first phase
+        bound = max(bound, current.f)
+        if current.heuristic == 0:
+            stats.end_iteration(bound, nodes_generated, expansions)
+            stats.finish()
+            return current.solution(), depth, time() - start_time, stats.peak_memory, nodes_expanded
+        expansions += 1
+        for successor in current.generate_successors():
+            if successor.path_cost < closed_set.get(successor.state, float('inf')):
+                nodes_generated += 1
+                heappush(open_list, successor)
+                closed_set[successor.state] = successor.path_cost
+    stats.end_iteration(bound, nodes_generated, expansions)
+    if not open_list:
+        stats.finish()
+        return None, depth, time() - start_time, stats.peak_memory, nodes_expanded
+
+    # Keep the open nodes with their best g and evict everything else
+    frontier = sorted((node for node in open_list if node.path_cost == closed_set[node.state]), key=lambda node: node.f)
+    counters["evictions"] += 1
+    counters["evicted_nodes"] += len(closed_set) - len(frontier)
+    open_list = closed_set = None
+    automaton = get_automaton('parent')
+    tables = heuristic_function.tables
+    action_index = {action: i for i, (action, _) in enumerate(ACTIONS)}
+
+    bound = frontier[0].f
+    previous_nodes = 0
+    while True:
+        minimum = float('inf')
+        bound_nodes = 0
+        for node in frontier:
+            if node.f > bound:
+                minimum = min(minimum, node.f)
+                continue
+            board = unpack_state(node.state, tables.cells, tables.tile_bits)
+            search = DepthFirstSearch(board_rows(board, tables.size), heuristic_function, automaton=automaton)
+            state = 1 + action_index[node.action] if node.action else 0
+            t = search.search(node.path_cost, node.heuristic, bound, state)
+            # Nodes visited below the frontier count as both generated and expanded, as in depth_first_astar
+            bound_nodes += search.nodes_expanded
+            nodes_expanded += search.nodes_expanded
+            nodes_generated += search.nodes_expanded
+            expansions += search.expansions
+            depth = max(depth, search.max_depth)
+            if t is True:
+                counters["regenerated_nodes"] += previous_nodes
+                stats.end_iteration(bound, nodes_generated, expansions)
+                stats.finish()
+                return node.solution() + search.path, depth, time() - start_time, stats.peak_memory, nodes_expanded
+            minimum = min(minimum, t)
+        # Every node of the previous bound is generated again by this one
+        counters["regenerated_nodes"] += previous_nodes
+        previous_nodes = bound_nodes
+        stats.end_iteration(bound, nodes_generated, expansions)
+        if minimum == float('inf'):
+            stats.finish()
+            return None, depth, time() - start_time, stats.peak_memory, nodes_expanded
+        bound = minimum
+
+# Search engines selectable by name
+ENGINES = {
+    'dfs': depth_first_astar,
+    'heap': heap_astar,
+    'heap_packed': partial(heap_astar, node_class=PackedPuzzleNode),
+    'parallel': parallel_astar,
+    'bounded': bounded_astar,
+    'weighted': weighted_astar,
+    'anytime': partial(weighted_astar, anytime=True),
+}
+
+# Heuristic instances by name, built once per process so tables are shared by every search
+heuristic_instances = {}
+
+def get_heuristic(name, size=4):
+    """ The heuristic instance for a name and board size, built on first use """
+    if (name, size) not in heuristic_instances:
+        heuristic_instances[name, size] = HEURISTICS[name](size=size)
+    return heuristic_instances[name, size]
+
+# Move pruning automata by name, built or loaded once per process
+automaton_instances = {}
+
+def get_automaton(name):
+    """ Transitions of the move pruning automaton for a name, built on first use """
+    if name not in automaton_instances:
+        automaton_instances[name] = PRUNING[name]()
+    return automaton_instances[name]
+
+def deepening_astar(initial_state, engine='dfs', heuristic='md', **options):
+    """ Iterative deepening A* search for a puzzle of any size using the named engine and heuristic, options go to the engine """
+    return ENGINES[engine](initial_state, get_heuristic(heuristic, len(initial_state)), **options)
+
+def puzzle_configuration(initial_state):
+    """ Puzzle as the space separated string used for configuration in the result records """
+    return ' '.join(str(num) for row in initial_state for num in row)
+
+def result_record(initial_state, solution, depth, duration, memory, nodes_expanded, heuristic):
+    """ Result in the record format of MD.json and MD_LC.json read by python/compare.py """
+    return {
+        "configuration": puzzle_configuration(initial_state),
+        "steps": ' '.join(solution) if solution is not None else None,
+        "max_search_depth": depth,
+        "time_taken_ms": int(duration * 1000),
+        "nodes_expanded": nodes_expanded,
+        "memory_bytes": memory,
+        "heuristic": heuristic,
+    }
+
+def solution_entry(initial_state, record):
+    """ Result in the solutions.json format """
+    entry = {"Initial State": [num for row in initial_state for num in row]}
+    if record["steps"] is not None:
+        entry["Solution Steps"] = record["steps"].split()
+        entry["Depth of Solution"] = record["max_search_depth"]
+        entry["Time Taken"] = f"{record['time_taken_ms'] / 1000:.4f} seconds"
+        entry["Memory Used"] = f"{record['memory_bytes']} bytes"
+    else:
+        entry["Solution"] = "No solution found"
+    return entry
+
+def solve_puzzle(job):
+    """ Solve one numbered puzzle, run in a worker process of solve_batch """
+    number, initial_state, engine, heuristic, options = job
+    options = dict(options)
+    # A transposition table is built per puzzle from its memory budget and policy
+    table = None
+    table_memory = options.pop('table_memory', None)
+    if table_memory:
+        table = TranspositionTable(table_memory, options.pop('table_policy'))
+        options['table'] = table
+    stats_memory = options.pop('stats_memory', None)
+    stats = SearchStats(stats_memory or 'rss')
+    options['stats'] = stats
+    solution, depth, duration, memory, nodes_expanded = deepening_astar(initial_state, engine, heuristic, **options)
+    record = result_record(initial_state, solution, depth, duration, memory, nodes_expanded, heuristic)
+    record["puzzle"] = number
+    if solution is not None:
+        record["optimality_gap"] = len(solution) - stats.lower_bound if stats.lower_bound is not None else 0
+    if table is not None:
+        record["transposition_table"] = table.stats()
+    if stats_memory:
+        record["stats"] = stats.as_dict()
+    if stats.counters:
+        record["counters"] = stats.counters
+    return record
+
+def result_options(engine, weight=WEIGHT, time_limit=None, max_nodes=None):
+    """ Options that change the solution an engine returns, the weight and limits of the weighted and anytime engines """
+    if engine in ('weighted', 'anytime'):
+        return {"weight": weight, "time_limit": time_limit, "max_nodes": max_nodes}
+    return {}
+
+def stream_key(configuration, heuristic, engine, options):
+    """ Key of a streamed record, its puzzle and the heuristic, engine and result_options it was solved with """
+    return configuration, heuristic, engine, tuple(sorted(options.items()))
+
+def read_stream(stream_path):
+    """ Records already streamed by earlier runs by stream_key, the last one wins """
+    records = {}
+    if os.path.exists(stream_path):
+        for record in read_json_lines(stream_path):
+            key = stream_key(record["configuration"], record["heuristic"], record.get("engine"), record.get("options", {}))
+            records[key] = record
+    return records
+
+def cached_record(number, initial_state, cache, heuristic):
+    """ Record for a puzzle whose optimal solution is in cache, or None """
+    start_time = time()
+    solution = cache.get([num for row in initial_state for num in row])
+    if solution is None:
+        return None
+    record = result_record(initial_state, solution, len(solution), time() - start_time, 0, 0, heuristic)
+    record["puzzle"] = number
+    record["optimality_gap"] = 0
+    record["cached"] = True
+    return record
+
+def solve_batch(puzzles, stream_path, engine='dfs', heuristic='md', workers=None, table_memory=None, table_policy='depth',
+                stats_memory=None, cache=None, pruning='parent', node_budget=None, memory_budget=None,
+                weight=WEIGHT, time_limit=None, max_nodes=None):
+    """ Solve puzzles on a process pool, yielding and appending each record to stream_path as it finishes
+
+    Puzzles stream_path already holds a proven optimal solution of, found with the same heuristic, engine
+    and result_options, are skipped so an interrupted run resumes where it stopped. Unsolved puzzles and
+    ones left short of optimal by a weight or limit are solved again. The rest
+    are started hardest first, using the starting heuristic as the estimate, so one long puzzle does
+    not run alone on one core at the end of the batch. The parallel engine spreads every puzzle over
+    the workers itself, so with it puzzles are solved one at a time. A table_memory in bytes gives
+    every dfs search its own transposition table. A stats_memory of 'rss' or 'tracemalloc' adds the
+    per bound statistics of each search to its record. With a SolutionCache puzzles it holds are answered
+    from it without a search, and every solution found is added to it. pruning names the move pruning
+    automaton of the dfs and parallel engines, the heap engines remove duplicates with their closed set.
+    node_budget and memory_budget in bytes cap the nodes every bounded search holds. The weighted and
+    anytime engines search with weight and stop each puzzle after time_limit seconds or max_nodes nodes,
+    their records carry the proven optimality gap and only solutions proven optimal enter the cache.
+    """
+    done = read_stream(stream_path)
+    # Build the heuristic for every board size once so every worker inherits it
+    for size in {len(initial) for initial in puzzles}:
+        get_heuristic(heuristic, size)
+    options = {}
+    if engine == 'parallel':
+        options['workers'] = workers
+    if table_memory and engine in ('dfs', 'weighted', 'anytime'):
+        options.update(table_memory=table_memory, table_policy=table_policy)
+    if stats_memory:
+        options['stats_memory'] = stats_memory
+    if engine in ('dfs', 'parallel', 'weighted', 'anytime'):
+        options['pruning'] = pruning
+        # Build the automaton once so every worker inherits it
+        get_automaton(pruning)
+    if engine == 'bounded':
+        options.update(node_budget=node_budget, memory_budget=memory_budget)
+    limits = result_options(engine, weight, time_limit, max_nodes)
+    options.update(limits)
+    jobs = []
+    for number, initial in enumerate(puzzles, 1):
+        record = done.get(stream_key(puzzle_configuration(initial), heuristic, engine, limits))
+        if record is None or record["steps"] is None or record.get("optimality_gap"):
+            jobs.append((number, initial, engine, heuristic, options))
+    jobs.sort(key=lambda job: get_heuristic(heuristic, len(job[1])).evaluate([num for row in job[1] for num in row]), reverse=True)
+    hits = []
+    if cache is not None:
+        for job in jobs:
+            record = cached_record(job[0], job[1], cache, heuristic)
+            if record:
+                hits.append(record)
+        answered = {record["puzzle"] for record in hits}
+        jobs = [job for job in jobs if job[0] not in answered]
+
+    with open(stream_path, 'a') as stream:
+        # Start on a fresh line if the last run was killed mid write
+        if stream.tell() > 0:
+            with open(stream_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    stream.write('\n')
+        for record in hits:
+            record.update(engine=engine, options=limits)
+            stream.write(json.dumps(record) + '\n')
+            stream.flush()
+            yield record
+        pool = Pool(workers) if engine != 'parallel' and jobs else None
+        with pool or nullcontext():
+            finished = pool.imap_unordered(solve_puzzle, jobs) if pool else map(solve_puzzle, jobs)
+            for record in finished:
+                if cache is not None and record["steps"] is not None and not record["optimality_gap"]:
+                    cache.put([num for row in puzzles[record["puzzle"] - 1] for num in row], record["steps"].split())
+                record.update(engine=engine, options=limits)
+                stream.write(json.dumps(record) + '\n')
+                stream.flush()
+                yield record
+
+def read_puzzles_from_file(filename, size=4):
+    """ Puzzles of size rows of size numbers, one per line, skipping lines that are not a solvable board """
     puzzles = []
+    cells = size * size
     with open(filename, 'r') as f:
         for line in f:
             numbers = list(map(int, line.strip().split()))
-            if len(numbers) != 16:  # Check if the line contains 16 numbers
+            if sorted(numbers) != list(range(cells)):  # Check if the line holds every tile of the board once
                 print("Warning: Invalid line encountered.")
                 continue
-            puzzle = [numbers[i:i+4] for i in range(0, 16, 4)]
+            if not is_solvable(numbers):
+                print("Warning: Unsolvable puzzle skipped.")
+                continue
+            puzzle = board_rows(numbers, size)
             puzzles.append(puzzle)
     return puzzles
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve 15-puzzles, or 8- and 24-puzzles with --size, with iterative deepening A*")
+    parser.add_argument('filename', nargs='?', default='puzzles.txt', help="file with one puzzle of size * size numbers per line")
+    parser.add_argument('--size', type=int, default=4, help="board width, 3 for the 8-puzzle and 5 for the 24-puzzle")
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='dfs', help="search engine used for every puzzle")
+    parser.add_argument('--heuristic', choices=sorted(HEURISTICS), default='md', help="heuristic used for every puzzle")
+    parser.add_argument('--records', metavar='FILE', help="also write results as MD.json style records for python/compare.py")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('--table-memory', type=int, default=0, metavar='MB', help="transposition table size for the dfs engine, 0 for none")
+    parser.add_argument('--table-policy', choices=TranspositionTable.POLICIES, default='depth', help="transposition table replacement policy")
+    parser.add_argument('--pruning', choices=sorted(PRUNING), default='parent', help="move pruning automaton of the dfs and parallel engines")
+    parser.add_argument('--node-budget', type=int, help=f"nodes the bounded engine holds, {NODE_BUDGET} unless a memory budget is given")
+    parser.add_argument('--memory-budget', type=int, default=0, metavar='MB', help="memory the bounded engine holds, about NODE_BYTES per node")
+    parser.add_argument('--weight', type=float, default=WEIGHT, help="heuristic weight of the weighted and anytime engines, solutions are at most this times optimal")
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS', help="time each weighted or anytime search may take")
+    parser.add_argument('--max-nodes', type=int, help="nodes each weighted or anytime search may visit")
+    parser.add_argument('--stats', choices=SearchStats.MEMORY_SOURCES, help="record per bound statistics, measuring memory with rss or tracemalloc")
+    parser.add_argument('--stream', default='solutions.jsonl', help="file every result is appended to as it finishes, rerunning resumes from it")
+    parser.add_argument('--store', metavar='FILE', help="also upsert every result into this indexed result store")
+    parser.add_argument('--cache', metavar='FILE', help="answer puzzles from this solution cache and add new solutions to it")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_ENTRIES, help="solutions kept in the cache before the least recently used are evicted")
+    parser.add_argument('--validate-cache', action='store_true', help="replay cached solutions before trusting them")
+    args = parser.parse_args()
+    if args.size != 4 and (args.cache or args.store):
+        parser.error("the solution cache and the result store hold 15-puzzles only")
+    if args.size != 4 and args.heuristic.startswith('pdb'):
+        parser.error("pattern databases are only built for the 15-puzzle")
+
     # Read puzzles from a file
-    filename = 'puzzles.txt'
-    puzzles = read_puzzles_from_file(filename)
+    puzzles = read_puzzles_from_file(args.filename, args.size)
+
+    store = ResultStore(args.store) if args.store else None
+    cache = SolutionCache(args.cache, args.cache_size, args.validate_cache) if args.cache else None
+    try:
+        for record in solve_batch(puzzles, args.stream, args.engine, args.heuristic, args.workers,
+                                  args.table_memory * 2 ** 20, args.table_policy, args.stats, cache, args.pruning,
+                                  args.node_budget, args.memory_budget * 2 ** 20, args.weight, args.time_limit, args.max_nodes):
+            if store:
+                store.append(record)
+            print(f"Solved Puzzle {record['puzzle']}:")
+            if record["steps"] is not None:
+                print(f"Solution found: {record['steps']}")
+                if record.get("optimality_gap"):
+                    print(f"At most {record['optimality_gap']} moves longer than optimal")
+            else:
+                print("No solution found")
+            if "transposition_table" in record:
+                print(f"Transposition table hit rate: {record['transposition_table']['hit_rate']:.2%}")
+            print("-----")
+    except KeyboardInterrupt:
+        print(f"Interrupted, finished results are kept in {args.stream}")
+        sys.exit(1)
+    finally:
+        if store:
+            store.close()
+        if cache:
+            print(f"Solution cache: {cache.stats()}")
+            cache.close()
 
+    # Collect every streamed result in puzzle order
+    streamed = read_stream(args.stream)
+    limits = result_options(args.engine, args.weight, args.time_limit, args.max_nodes)
     results = {}
+    records = []
     for idx, initial in enumerate(puzzles):
-        print(f"Solving Puzzle {idx + 1}:")
-        
-        solution, depth, duration, memory = deepening_astar(initial)
-        
-        puzzle_key = f"Puzzle {idx + 1}"
-        results[puzzle_key] = {}
-        results[puzzle_key]["Initial State"] = [num for row in initial for num in row]
-        if solution:
-            results[puzzle_key]["Solution Steps"] = solution
-            results[puzzle_key]["Depth of Solution"] = depth
-            results[puzzle_key]["Time Taken"] = f"{duration:.4f} seconds"
-            results[puzzle_key]["Memory Used"] = f"{memory} bytes"
-            print(f"Solution found: {' '.join(solution)}")
-        else:
-            results[puzzle_key]["Solution"] = "No solution found"
-            print("No solution found")
-        print("-----")
+        record = streamed[stream_key(puzzle_configuration(initial), args.heuristic, args.engine, limits)]
+        results[f"Puzzle {idx + 1}"] = solution_entry(initial, record)
+        records.append(record)
 
     # Save results to a JSON file
     with open("solutions.json", "w") as json_file:
-        json.dump(results, json_file, indent=4)
\ No newline at end of file
+        json.dump(results, json_file, indent=4)
+
+    if args.records:
+        with open(args.records, "w") as json_file:
+            json.dump(records, json_file, indent=4)
@@ -0,0 +1,141 @@
+"""Builds, caches and loads the duplicate pruning automaton of the 15-puzzle, after Taylor and Korf.
+
+Two move sequences that leave the blank and every tile in the same place reach the same state from
+any start where both can be made. Walking the blank through every sequence up to max_length moves
+on an unbounded board finds such pairs. A sequence is forbidden when a shorter sequence, or one of
+the same length that comes first in the order the solver tries moves, has the same effect and keeps
+the blank inside the rectangle the forbidden one covers, so it can be made wherever the forbidden
+one can. The automaton matches forbidden sequences as suffixes of the moves made so far. Its
+transitions are indexed by state and by move in L R D U order, -1 meaning the move is pruned.
+State 0 is the start state.
+
+A path that contains a forbidden sequence can be shortened or made earlier by swapping it for its
+replacement, so the earliest shortest path to every state survives and optimal solutions are kept.
+"""
+
+import os
+import argparse
+import numpy as np
+from collections import deque
+from time import time
+
+# Moves of the blank as (row change, column change), in the order the solver tries them
+MOVES = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+# Longest sequences compared, the automaton grows about eightfold and takes about ten times longer to build every two moves
+DEFAULT_LENGTH = 10
+# Automata are cached with the pattern databases
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb')
+
+def effect(moves):
+    """ Final blank and displaced tiles of a move sequence started at (0, 0), and the positions the blank passed """
+    blank = (0, 0)
+    # Where each displaced tile started, by the position it is on now
+    origin = {}
+    footprint = [blank]
+    for move in moves:
+        dx, dy = MOVES[move]
+        target = (blank[0] + dx, blank[1] + dy)
+        origin[blank] = origin.pop(target, target)
+        blank = target
+        footprint.append(blank)
+    moved = tuple(sorted((start, now) for now, start in origin.items() if start != now))
+    return (blank, moved), footprint
+
+def bounding_box(footprint):
+    """ Smallest (top, bottom, left, right) rectangle holding every position """
+    rows = [row for row, _ in footprint]
+    cols = [col for _, col in footprint]
+    return min(rows), max(rows), min(cols), max(cols)
+
+def inside(footprint, box):
+    """ Whether every position lies in a rectangle """
+    top, bottom, left, right = box
+    return all(top <= row <= bottom and left <= col <= right for row, col in footprint)
+
+def forbidden_sequences(max_length=DEFAULT_LENGTH):
+    """ Shortest forbidden sequences, each a tuple of move indexes, none containing another """
+    start, footprint = effect(())
+    # Footprints of the allowed sequences with every effect, the empty sequence stands for doing nothing
+    allowed_effects = {start: [footprint]}
+    allowed = [()]
+    forbidden = []
+    for length in range(1, max_length + 1):
+        previous = set(allowed)
+        extended = []
+        # Sequences are extended in move order, so earlier sequences of the same length are seen first
+        for sequence in allowed:
+            for move in range(len(MOVES)):
+                candidate = sequence + (move,)
+                # A candidate ending in a forbidden sequence is already pruned
+                if candidate[1:] not in previous:
+                    continue
+                key, footprint = effect(candidate)
+                box = bounding_box(footprint)
+                if any(inside(other, box) for other in allowed_effects.get(key, ())):
+                    forbidden.append(candidate)
+                    continue
+                extended.append(candidate)
+                allowed_effects.setdefault(key, []).append(footprint)
+        allowed = extended
+    return forbidden
+
+def build_automaton(max_length=DEFAULT_LENGTH):
+    """ Transition table matching every forbidden sequence as a suffix of the moves made, one row per state """
+    transitions = [[-1] * len(MOVES)]
+    terminal = [False]
+    # Trie of the forbidden sequences
+    for sequence in forbidden_sequences(max_length):
+        state = 0
+        for move in sequence:
+            if transitions[state][move] < 0:
+                transitions.append([-1] * len(MOVES))
+                terminal.append(False)
+                transitions[state][move] = len(transitions) - 1
+            state = transitions[state][move]
+        terminal[state] = True
+    # Aho-Corasick failure links, filled in breadth first so every move has a next state
+    failure = [0] * len(transitions)
+    queue = deque()
+    for move in range(len(MOVES)):
+        if transitions[0][move] < 0:
+            transitions[0][move] = 0
+        else:
+            queue.append(transitions[0][move])
+    while queue:
+        state = queue.popleft()
+        terminal[state] = terminal[state] or terminal[failure[state]]
+        for move in range(len(MOVES)):
+            child = transitions[state][move]
+            if child < 0:
+                transitions[state][move] = transitions[failure[state]][move]
+            else:
+                failure[child] = transitions[failure[state]][move]
+                queue.append(child)
+    return np.array([[-1 if terminal[child] else child for child in row] for row in transitions], dtype=np.int32)
+
+def automaton_path(max_length=DEFAULT_LENGTH, directory=DEFAULT_DIRECTORY):
+    """ File holding the automaton for a sequence length """
+    return os.path.join(directory, f'move_automaton_{max_length}.npy')
+
+def load_automaton(max_length=DEFAULT_LENGTH, directory=DEFAULT_DIRECTORY):
+    """ Transition table as a list of rows, built and cached first if needed """
+    path = automaton_path(max_length, directory)
+    if os.path.exists(path):
+        return np.load(path).tolist()
+    transitions = build_automaton(max_length)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename so readers never see a partial file
+    temporary = path + '.tmp.npy'
+    np.save(temporary, transitions)
+    os.replace(temporary, path)
+    return transitions.tolist()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and cache the duplicate pruning automaton for the 15-puzzle")
+    parser.add_argument('--length', type=int, default=DEFAULT_LENGTH, help="longest move sequences compared")
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY, help="directory the automaton is cached in")
+    args = parser.parse_args()
+
+    start_time = time()
+    transitions = load_automaton(args.length, args.directory)
+    print(f"{automaton_path(args.length, args.directory)} ready with {len(transitions)} states in {time() - start_time:.1f} seconds")
@@ -0,0 +1,146 @@
+"""Builds, caches and loads additive disjoint pattern databases for the 15-puzzle.
+
+Each table holds, for every placement of its pattern tiles, the fewest moves of those tiles needed
+to bring them home. Moves of other tiles are free, so tables of disjoint patterns can be added.
+A table is indexed by the positions of its tiles as base 16 digits, one byte per entry, and is
+loaded with mmap so every solver process shares the same read only pages.
+"""
+
+import os
+import mmap
+import argparse
+import numpy as np
+from time import time
+
+# Disjoint tile partitions, the tables of one partition are added together
+PARTITIONS = {
+    '5-5-5': [(1, 2, 3, 4, 8), (5, 6, 9, 10, 13), (7, 11, 12, 14, 15)],
+    '6-6-3': [(1, 5, 6, 9, 10, 13), (7, 8, 11, 12, 14, 15), (2, 3, 4)],
+}
+# Tables are cached next to this file unless another directory is given
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb')
+# Entry for placements that cannot occur, such as two tiles on one position
+UNREACHED = 255
+# States expanded at once while building, bounds the temporary arrays
+CHUNK_SIZE = 1 << 20
+
+def build_neighbours():
+    """ Neighbouring positions of every position in L R D U order, -1 where the move leaves the board """
+    neighbours = np.full((16, 4), -1, dtype=np.int64)
+    for pos in range(16):
+        row, col = divmod(pos, 4)
+        for direction, (dx, dy) in enumerate([(0, -1), (0, 1), (1, 0), (-1, 0)]):
+            if 0 <= row + dx < 4 and 0 <= col + dy < 4:
+                neighbours[pos, direction] = (row + dx) * 4 + col + dy
+    return neighbours
+
+NEIGHBOURS = build_neighbours()
+
+def pattern_weights(tiles):
+    """ Weight of each pattern tile's position in the table index """
+    return [16 ** (len(tiles) - 1 - i) for i in range(len(tiles))]
+
+def table_path(tiles, directory=DEFAULT_DIRECTORY):
+    """ File holding the table for a pattern """
+    return os.path.join(directory, 'pdb_' + '-'.join(map(str, tiles)) + '.bin')
+
+def goal_index(tiles):
+    """ Table index of the pattern tiles on their goal positions """
+    return sum((tile - 1) * weight for tile, weight in zip(tiles, pattern_weights(tiles)))
+
+def expand(states, weights):
+    """ Split the successors of packed (index, blank) states into zero cost blank moves and pattern tile moves """
+    free, costly = [], []
+    for start in range(0, len(states), CHUNK_SIZE):
+        chunk = states[start:start + CHUNK_SIZE]
+        index, blank = chunk >> 4, chunk & 15
+        positions = (index[:, None] // weights) % 16
+        for direction in range(4):
+            neighbour = NEIGHBOURS[blank, direction]
+            on_board = neighbour >= 0
+            i, b, n, p = index[on_board], blank[on_board], neighbour[on_board], positions[on_board]
+            hit = p == n[:, None]
+            occupied = hit.any(axis=1)
+            # The blank moves onto a position without a pattern tile
+            free.append((i[~occupied] << 4) | n[~occupied])
+            # A pattern tile slides into the blank's position
+            moved = weights[hit[occupied].argmax(axis=1)]
+            costly.append(((i[occupied] + (b[occupied] - n[occupied]) * moved) << 4) | n[occupied])
+    return np.concatenate(free), np.concatenate(costly)
+
+def build_table(tiles):
+    """ Breadth-first search back from the goal, counting only moves of the pattern tiles """
+    size = 16 ** len(tiles)
+    weights = np.array(pattern_weights(tiles), dtype=np.int64)
+    table = np.full(size, UNREACHED, dtype=np.uint8)
+    # Blank positions already reached for every placement of the pattern tiles, one bit per position
+    seen = np.zeros(size, dtype=np.uint16)
+
+    def unseen(states):
+        states = np.unique(states)
+        index, blank = states >> 4, states & 15
+        states = states[(seen[index] >> blank.astype(np.uint16)) & 1 == 0]
+        np.bitwise_or.at(seen, states >> 4, np.left_shift(np.uint16(1), (states & 15).astype(np.uint16)))
+        return states
+
+    frontier = np.array([(goal_index(tiles) << 4) | 15], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        # Close the level over blank moves that cost nothing
+        level = []
+        current = unseen(frontier)
+        while current.size:
+            level.append(current)
+            index = current >> 4
+            table[index[table[index] == UNREACHED]] = depth
+            current, _ = expand(current, weights)
+            current = unseen(current)
+        if not level:
+            break
+        level = np.concatenate(level)
+        _, frontier = expand(level, weights)
+        depth += 1
+    return table
+
+def is_valid(path, tiles):
+    """ Whether path holds a complete table for the pattern """
+    if not os.path.exists(path) or os.path.getsize(path) != 16 ** len(tiles):
+        return False
+    with open(path, 'rb') as f:
+        f.seek(goal_index(tiles))
+        return f.read(1) == b'\x00'
+
+def write_table(table, path):
+    """ Write a table so that readers never see a partial file """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + '.tmp'
+    table.tofile(temporary)
+    os.replace(temporary, path)
+
+def ensure_table(tiles, directory=DEFAULT_DIRECTORY):
+    """ Build and cache the table for a pattern unless a valid one is already on disk """
+    path = table_path(tiles, directory)
+    if not is_valid(path, tiles):
+        write_table(build_table(tiles), path)
+    return path
+
+def load_table(tiles, directory=DEFAULT_DIRECTORY):
+    """ Memory map the table for a pattern, building it first if needed """
+    path = ensure_table(tiles, directory)
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def load_partition(partition, directory=DEFAULT_DIRECTORY):
+    """ Memory map every table of a partition """
+    return [load_table(tiles, directory) for tiles in PARTITIONS[partition]]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and cache additive pattern databases for the 15-puzzle")
+    parser.add_argument('--partition', choices=sorted(PARTITIONS), default='6-6-3', help="tile partition to build")
+    parser.add_argument('--directory', default=DEFAULT_DIRECTORY, help="directory the tables are cached in")
+    args = parser.parse_args()
+
+    for tiles in PARTITIONS[args.partition]:
+        start_time = time()
+        path = ensure_table(tiles, args.directory)
+        print(f"{path} ready in {time() - start_time:.1f} seconds")
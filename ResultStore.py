@@ -0,0 +1,282 @@
+"""Indexed store of solver results, one SQLite file in place of monolithic JSON result files.
+
+Records are keyed by the puzzle packed into one integer, the tile at position pos in bits 4 * pos
+to 4 * pos + 3 on a 4x4 board as in the solver, together with the heuristic. Each tile takes as
+many bits as the largest tile needs, so boards up to 4x4 fit and larger ones are refused. The
+engine and result options are part of the key as well, so weighted and anytime results never
+replace optimal ones, and stores written before they were are migrated when opened.
+Appending or upserting one record touches one row, runs from several machines are merged row by
+row, and indexes on time and nodes expanded answer range queries without reading the rest. Fields
+outside the MD.json format, such as search statistics, are kept as JSON so every record exports
+unchanged.
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+from time import time
+from itertools import islice
+
+# Columns of the MD.json record format, stored as their own columns
+COLUMNS = ("configuration", "steps", "max_search_depth", "time_taken_ms", "nodes_expanded", "memory_bytes")
+# Records inserted per transaction when importing
+BATCH_SIZE = 10000
+# Lines of a JSON lines stream parsed together as one JSON array
+LINE_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    state INTEGER NOT NULL,
+    heuristic TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    options TEXT NOT NULL,
+    configuration TEXT NOT NULL,
+    steps TEXT,
+    max_search_depth INTEGER,
+    time_taken_ms INTEGER,
+    nodes_expanded INTEGER,
+    memory_bytes INTEGER,
+    extra TEXT,
+    PRIMARY KEY (state, heuristic, engine, options)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_time ON results (heuristic, time_taken_ms);
+CREATE INDEX IF NOT EXISTS results_nodes ON results (heuristic, nodes_expanded);
+"""
+# Columns every row is keyed by
+KEY = "state, heuristic, engine, options"
+
+def pack_configuration(configuration):
+    """ Packed state of a configuration string, as a signed 64 bit integer so SQLite can store it """
+    tiles = list(map(int, configuration.split()))
+    bits = (len(tiles) - 1).bit_length()
+    if len(tiles) * bits > 64 or any(tile < 0 or tile >= len(tiles) for tile in tiles):
+        raise ValueError(f"cannot pack {configuration!r} into 64 bits, only boards of up to 16 tiles are stored")
+    state = 0
+    for pos, tile in enumerate(tiles):
+        state |= tile << (bits * pos)
+    return state - (1 << 64) if state >= 1 << 63 else state
+
+def options_key(options):
+    """ Result options as stored in the key, empty for records that do not name theirs """
+    return json.dumps(options, sort_keys=True) if options is not None else ""
+
+def record_row(record, heuristic=None):
+    """ Row of a record, heuristic fills in for records that do not name theirs, such as those in MD.json """
+    heuristic = record.get("heuristic", heuristic)
+    if heuristic is None:
+        raise ValueError(f"no heuristic for record {record['configuration']}")
+    extra = {key: value for key, value in record.items() if key not in COLUMNS and key not in ("heuristic", "engine", "options")}
+    return (pack_configuration(record["configuration"]), heuristic, record.get("engine") or "", options_key(record.get("options"))) + \
+        tuple(record.get(column) for column in COLUMNS) + (json.dumps(extra) if extra else None,)
+
+def row_record(row):
+    """ Record of a row, in the format the solver writes """
+    state, heuristic, engine, options, *values, extra = row
+    record = dict(zip(COLUMNS, values))
+    if record["memory_bytes"] is None:
+        del record["memory_bytes"]
+    record["heuristic"] = heuristic
+    if extra:
+        record.update(json.loads(extra))
+    if engine:
+        record["engine"] = engine
+    if options:
+        record["options"] = json.loads(options)
+    return record
+
+class ResultStore:
+    """ Results keyed by packed state, heuristic, engine and result options in one SQLite file """
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # Appends from a running solver should not block readers, and only need a sync at checkpoints
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(results)")]
+        if columns and "engine" not in columns:
+            self.migrate()
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def migrate(self):
+        """ Rebuild a store keyed by state and heuristic alone, moving the engine and options of its records into the key """
+        self.connection.execute("BEGIN")
+        with self.connection:
+            self.connection.execute("ALTER TABLE results RENAME TO unkeyed_results")
+            self.connection.execute("DROP INDEX IF EXISTS results_time")
+            self.connection.execute("DROP INDEX IF EXISTS results_nodes")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.connection.execute(statement)
+            rows = (record_row({**dict(zip(COLUMNS, values)), "heuristic": heuristic, **(json.loads(extra) if extra else {})})
+                    for state, heuristic, *values, extra in self.connection.execute("SELECT * FROM unkeyed_results"))
+            self.connection.executemany(f"INSERT INTO results VALUES ({', '.join('?' * (len(COLUMNS) + 5))})", rows)
+            self.connection.execute("DROP TABLE unkeyed_results")
+
+    def upsert(self, records, heuristic=None, replace=True):
+        """ Insert records, replacing any stored record for the same configuration, heuristic, engine and options unless
+        replace is False
+
+        Returns the number of records written.
+        """
+        placeholders = ", ".join("?" * (len(COLUMNS) + 5))
+        conflict = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS + ("extra",)) \
+            if replace else "DO NOTHING"
+        statement = f"INSERT INTO results VALUES ({placeholders}) ON CONFLICT ({KEY}) {conflict}"
+        written = 0
+        batch = []
+        for record in records:
+            batch.append(record_row(record, heuristic))
+            if len(batch) == BATCH_SIZE:
+                written += self.write(statement, batch)
+                batch = []
+        return written + self.write(statement, batch)
+
+    def write(self, statement, rows):
+        """ Run statement for every row in one transaction, returning the number of rows changed """
+        if not rows:
+            return 0
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(statement, rows)
+            return self.connection.total_changes - before
+
+    def append(self, record, heuristic=None):
+        """ Store one record, replacing an earlier result for the same configuration, heuristic, engine and options """
+        self.upsert([record], heuristic)
+
+    def merge(self, path, replace=False):
+        """ Merge every record of another store, keeping records already here unless replace is True
+
+        A store written before results were keyed by engine is migrated first.
+        """
+        ResultStore(path).close()
+        self.connection.execute("ATTACH DATABASE ? AS other", (path,))
+        try:
+            conflict = "DO UPDATE SET " + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS + ("extra",)) \
+                if replace else "DO NOTHING"
+            # WHERE true lets SQLite tell the upsert clause from a join condition
+            return self.write(f"INSERT INTO results SELECT * FROM other.results WHERE true ON CONFLICT ({KEY}) {conflict}", [()])
+        finally:
+            self.connection.execute("DETACH DATABASE other")
+
+    def get(self, configuration, heuristic, engine=None, options=None):
+        """ Stored record for a configuration, heuristic, engine and result options, or None
+
+        Records that name no engine or options, such as those of MD.json, are found by leaving them out.
+        """
+        row = self.connection.execute("SELECT * FROM results WHERE state = ? AND heuristic = ? AND engine = ? AND options = ?",
+                                      (pack_configuration(configuration), heuristic, engine or "", options_key(options))).fetchone()
+        return row_record(row) if row else None
+
+    def query(self, heuristic=None, min_time_ms=None, max_time_ms=None, min_nodes=None, max_nodes=None, engine=None):
+        """ Yield records matching every given bound, bounds are inclusive """
+        conditions, parameters = [], []
+        for condition, value in (("heuristic = ?", heuristic), ("engine = ?", engine), ("time_taken_ms >= ?", min_time_ms), ("time_taken_ms <= ?", max_time_ms),
+                                 ("nodes_expanded >= ?", min_nodes), ("nodes_expanded <= ?", max_nodes)):
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        for row in self.connection.execute("SELECT * FROM results" + where, parameters):
+            yield row_record(row)
+
+    def count(self):
+        """ Number of stored records """
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+def read_json_lines(path, skipped=None):
+    """ Yield the records of a JSON lines stream like solutions.jsonl, skipping blank lines and lines that are not JSON
+
+    Lines are parsed LINE_BATCH at a time as one JSON array, and one at a time only in a batch that fails.
+    skipped, when given, is called with the number of every line that was not JSON.
+    """
+    with open(path, 'r') as f:
+        first = 1
+        while lines := list(islice(f, LINE_BATCH)):
+            numbered = [(number, line) for number, line in enumerate(lines, first) if line.strip()]
+            first += len(lines)
+            try:
+                yield from json.loads('[' + ','.join(line for _, line in numbered) + ']')
+                continue
+            except json.JSONDecodeError:
+                pass
+            for number, line in numbered:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed while writing leaves a partial last line
+                    if skipped:
+                        skipped(number)
+
+def read_records(path):
+    """ Yield the records of a JSON list like MD.json or of a JSON lines stream like solutions.jsonl """
+    if path.endswith('.jsonl'):
+        yield from read_json_lines(path)
+        return
+    with open(path, 'r') as f:
+        yield from json.load(f)
+
+def export_records(records, path):
+    """ Write records as a JSON list in the MD.json format without holding them all in memory """
+    with open(path, 'w') as f:
+        count = 0
+        for record in records:
+            f.write(",\n    " if count else "[\n    ")
+            f.write(json.dumps(record, indent=4).replace("\n", "\n    "))
+            count += 1
+        f.write("\n]" if count else "[]")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import, merge, query and export solver results kept in an indexed store")
+    parser.add_argument('store', help="store file, created when missing")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('import', help="upsert the records of JSON or JSON lines result files")
+    add.add_argument('files', nargs='+')
+    add.add_argument('--heuristic', help="heuristic of records that do not name one, md for MD.json and md_lc for MD_LC.json")
+    add.add_argument('--keep-existing', action='store_true', help="keep stored records instead of replacing them")
+    merge = commands.add_parser('merge', help="merge stores written on other machines")
+    merge.add_argument('stores', nargs='+')
+    merge.add_argument('--replace', action='store_true', help="prefer the merged records over stored ones")
+    for name, text in (('query', "print matching records as JSON lines"), ('export', "write matching records as a JSON list")):
+        command = commands.add_parser(name, help=text)
+        if name == 'export':
+            command.add_argument('output')
+        command.add_argument('--heuristic')
+        command.add_argument('--engine')
+        command.add_argument('--min-time', type=int, metavar='MS')
+        command.add_argument('--max-time', type=int, metavar='MS')
+        command.add_argument('--min-nodes', type=int)
+        command.add_argument('--max-nodes', type=int)
+    args = parser.parse_args()
+
+    with ResultStore(args.store) as store:
+        start_time = time()
+        if args.command == 'import':
+            for path in args.files:
+                written = store.upsert(read_records(path), args.heuristic, not args.keep_existing)
+                print(f"Wrote {written} records from {path}")
+        elif args.command == 'merge':
+            for path in args.stores:
+                if not os.path.exists(path):
+                    print(f"Skipping {path}, not found")
+                    continue
+                print(f"Merged {store.merge(path, args.replace)} records from {path}")
+        else:
+            records = store.query(args.heuristic, args.min_time, args.max_time, args.min_nodes, args.max_nodes, args.engine)
+            if args.command == 'export':
+                export_records(records, args.output)
+            else:
+                for record in records:
+                    print(json.dumps(record))
+        if args.command != 'query':
+            print(f"{store.count()} records in {args.store}, {time() - start_time:.2f} seconds")
@@ -0,0 +1,182 @@
+"""Persistent cache of optimal 15-puzzle solutions kept in one SQLite file.
+
+Reflecting a board across its main diagonal and relabelling every tile with the tile whose goal is
+the reflection of its own goal leaves the goal unchanged, so an optimal solution of the reflected
+board, with L and U swapped and R and D swapped, is an optimal solution of the original. Both
+orientations of a board share one entry, keyed by the smaller of their packed states. The cache
+holds at most max_entries solutions and evicts the least recently used beyond that.
+"""
+
+import os
+import sqlite3
+import argparse
+from time import time
+
+# Entries kept unless another cap is given
+DEFAULT_MAX_ENTRIES = 1000000
+# Moves of the blank as (row change, column change)
+MOVES = {'L': (0, -1), 'R': (0, 1), 'D': (1, 0), 'U': (-1, 0)}
+# Move of the blank on the reflected board for every move on the original
+REFLECTED_MOVE = {'L': 'U', 'U': 'L', 'R': 'D', 'D': 'R'}
+# Position every position is reflected onto
+REFLECTED_POSITION = [(pos % 4) * 4 + pos // 4 for pos in range(16)]
+# Tile every tile is relabelled as, the tile whose goal is the reflection of its goal, the blank stays
+REFLECTED_TILE = [0] + [REFLECTED_POSITION[tile - 1] + 1 for tile in range(1, 16)]
+GOAL = list(range(1, 16)) + [0]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    state INTEGER PRIMARY KEY,
+    steps TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solutions_used ON solutions (used);
+"""
+
+def reflect(board):
+    """ Flat board reflected across the main diagonal with its tiles relabelled """
+    reflected = [0] * 16
+    for pos, tile in enumerate(board):
+        reflected[REFLECTED_POSITION[pos]] = REFLECTED_TILE[tile]
+    return reflected
+
+def pack(board):
+    """ Flat board packed as in the solver, the tile at position pos in bits 4 * pos to 4 * pos + 3 """
+    state = 0
+    for pos, tile in enumerate(board):
+        state |= tile << (4 * pos)
+    return state
+
+def canonical(board):
+    """ (key, reflected) for a flat board, reflected tells whether the key belongs to the reflected board """
+    state, reflected_state = pack(board), pack(reflect(board))
+    key, reflected = (reflected_state, True) if reflected_state < state else (state, False)
+    # SQLite integers are signed 64 bit
+    return key - (1 << 64) if key >= 1 << 63 else key, reflected
+
+def reflect_moves(moves):
+    """ Moves solving the reflected board for moves solving a board, and the other way around """
+    return [REFLECTED_MOVE[move] for move in moves]
+
+def replay(board, moves):
+    """ Board after applying moves to a flat board, or None if a move leaves the board """
+    board = list(board)
+    blank = board.index(0)
+    for move in moves:
+        row, col = divmod(blank, 4)
+        dx, dy = MOVES[move]
+        if not (0 <= row + dx < 4 and 0 <= col + dy < 4):
+            return None
+        target = (row + dx) * 4 + col + dy
+        board[blank], board[target] = board[target], 0
+        blank = target
+    return board
+
+class SolutionCache:
+    """ Optimal solutions keyed by canonical state, with least recently used eviction
+
+    With validate set every hit is replayed before it is returned and entries that do not reach the
+    goal are dropped and reported as misses.
+    """
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, validate=False):
+        self.path = path
+        self.max_entries = max_entries
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.invalid = 0
+        self.evictions = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        # Kept up to date by every insert and delete, so put need not count the table
+        self.entries = self.count()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, board):
+        """ Cached optimal moves for a flat board in its own orientation, or None """
+        key, reflected = canonical(board)
+        row = self.connection.execute("SELECT steps FROM solutions WHERE state = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        moves = row[0].split()
+        if reflected:
+            moves = reflect_moves(moves)
+        if self.validate and replay(board, moves) != GOAL:
+            with self.connection:
+                self.entries -= self.connection.execute("DELETE FROM solutions WHERE state = ?", (key,)).rowcount
+            self.invalid += 1
+            self.misses += 1
+            return None
+        with self.connection:
+            self.connection.execute("UPDATE solutions SET used = ? WHERE state = ?", (time(), key))
+        self.hits += 1
+        return moves
+
+    def put(self, board, moves):
+        """ Cache optimal moves solving a flat board, keeping a stored solution that is as short """
+        key, reflected = canonical(board)
+        steps = ' '.join(reflect_moves(moves) if reflected else moves)
+        with self.connection:
+            inserted = self.connection.execute("INSERT INTO solutions VALUES (?, ?, ?) ON CONFLICT (state) DO NOTHING",
+                                               (key, steps, time())).rowcount
+            if not inserted:
+                self.connection.execute("UPDATE solutions SET steps = CASE WHEN length(?) < length(steps) THEN ? ELSE steps END, "
+                                        "used = ? WHERE state = ?", (steps, steps, time(), key))
+            self.entries += inserted
+            excess = self.entries - self.max_entries
+            if excess > 0:
+                evicted = self.connection.execute("DELETE FROM solutions WHERE state IN "
+                                                  "(SELECT state FROM solutions ORDER BY used LIMIT ?)", (excess,)).rowcount
+                self.entries -= evicted
+                self.evictions += evicted
+
+    def count(self):
+        """ Number of cached solutions, counted in the file """
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def verify(self):
+        """ Replay every cached solution from its board, dropping those that do not reach the goal
+
+        Returns the number of entries dropped.
+        """
+        bad = []
+        for key, steps in self.connection.execute("SELECT state, steps FROM solutions"):
+            state = key + (1 << 64) if key < 0 else key
+            board = [(state >> (4 * pos)) & 15 for pos in range(16)]
+            if replay(board, steps.split()) != GOAL:
+                bad.append((key,))
+        with self.connection:
+            self.connection.executemany("DELETE FROM solutions WHERE state = ?", bad)
+        self.entries -= len(bad)
+        return len(bad)
+
+    def stats(self):
+        """ Counters of this session """
+        lookups = self.hits + self.misses
+        return {"entries": self.entries, "hits": self.hits, "misses": self.misses, "invalid": self.invalid,
+                "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or verify a solution cache")
+    parser.add_argument('cache', help="cache file")
+    parser.add_argument('--verify', action='store_true', help="replay every cached solution and drop those that do not solve their board")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.cache):
+        print(f"{args.cache} not found")
+    else:
+        with SolutionCache(args.cache) as cache:
+            if args.verify:
+                print(f"Dropped {cache.verify()} invalid solutions")
+            print(f"{cache.count()} solutions in {args.cache}")
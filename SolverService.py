@@ -0,0 +1,421 @@
+"""Long lived local sliding puzzle solver service speaking JSON lines over a Unix socket or a localhost port.
+
+Each request is one JSON object per line:
+    {"op": "solve", "id": 1, "puzzle": [9, 16 or 25 numbers], "heuristic": "md_lc", "engine": "dfs", "deadline": 30, "options": {}}
+    {"op": "cancel", "id": 1}
+and every reply is one JSON object per line tagged with the request id and an event: queued, started,
+progress after every bound with the bound and node counts so far, then exactly one of result, error,
+cancelled or deadline. Solves run on a pool of worker processes that import the solver and load the
+heuristics once. Identical submissions share one job, and a job nobody waits for any more is dropped
+from the queue or its worker is killed and replaced, so cancelled searches stop at once. The solution
+cache and the pattern databases hold 15-puzzles only.
+"""
+
+import os
+import sys
+import json
+import math
+import signal
+import asyncio
+import argparse
+import importlib
+from itertools import count
+from collections import deque
+from multiprocessing import Pipe, Process
+from SolutionCache import SolutionCache
+
+solver = importlib.import_module('15PuzzleSolver')
+
+# Engines a worker can run, the parallel engine needs a pool of its own and worker processes cannot start one
+SERVICE_ENGINES = ('dfs', 'heap', 'heap_packed', 'bounded', 'weighted', 'anytime')
+# Engine options a request may set, with the smallest value each accepts, pruning takes an automaton name
+SERVICE_OPTIONS = {'pruning': None, 'node_budget': 1, 'memory_budget': 0, 'weight': 1, 'time_limit': 0, 'max_nodes': 1}
+# Options each engine takes, any other would reach the engine as an unexpected keyword argument
+ENGINE_OPTIONS = {
+    'dfs': ('pruning',),
+    'heap': (),
+    'heap_packed': (),
+    'bounded': ('node_budget', 'memory_budget'),
+    'weighted': ('pruning', 'weight', 'time_limit', 'max_nodes'),
+    'anytime': ('pruning', 'weight', 'time_limit', 'max_nodes'),
+}
+# Widest board accepted, the 24-puzzle
+MAX_SIZE = 5
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver.sock')
+
+def is_number(value):
+    """ Whether a decoded JSON value is a finite number, JSON booleans decode as Python ints """
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def parse_request(request):
+    """ (board, size, engine, heuristic, options, deadline) of a solve request, raising ValueError when it is malformed """
+    puzzle = request.get("puzzle")
+    if isinstance(puzzle, str):
+        puzzle = puzzle.split()
+    if not isinstance(puzzle, list) or len(puzzle) > MAX_SIZE * MAX_SIZE:
+        raise ValueError(f"puzzle must be a list or string of at most {MAX_SIZE * MAX_SIZE} numbers")
+    board = [int(num) if isinstance(num, str) and num.isdigit() else num for num in puzzle]
+    size = math.isqrt(len(board))
+    if size < 2 or not all(isinstance(num, int) and not isinstance(num, bool) for num in board) or sorted(board) != list(range(size * size)):
+        raise ValueError("puzzle must hold the numbers 0 to size * size - 1 of a square board")
+    if not solver.is_solvable(board):
+        raise ValueError("puzzle is not solvable")
+    engine = request.get("engine", "dfs")
+    heuristic = request.get("heuristic", "md")
+    if engine not in SERVICE_ENGINES:
+        raise ValueError(f"engine must be one of {SERVICE_ENGINES}")
+    if not isinstance(heuristic, str) or heuristic not in solver.HEURISTICS:
+        raise ValueError(f"heuristic must be one of {sorted(solver.HEURISTICS)}")
+    if size != 4 and heuristic.startswith('pdb'):
+        raise ValueError("pattern databases are only built for the 15-puzzle")
+    options = request.get("options", {})
+    if not isinstance(options, dict) or any(name not in SERVICE_OPTIONS for name in options):
+        raise ValueError(f"options must be an object with keys among {tuple(SERVICE_OPTIONS)}")
+    unused = [name for name in options if name not in ENGINE_OPTIONS[engine]]
+    if unused:
+        raise ValueError(f"the {engine} engine does not take {', '.join(unused)}, only {ENGINE_OPTIONS[engine] or 'no options'}")
+    for name, value in options.items():
+        if name == 'pruning':
+            if not isinstance(value, str) or value not in solver.PRUNING:
+                raise ValueError(f"pruning must be one of {sorted(solver.PRUNING)}")
+        elif not is_number(value) or value < SERVICE_OPTIONS[name]:
+            raise ValueError(f"{name} must be a number of at least {SERVICE_OPTIONS[name]}")
+        elif name in ('node_budget', 'memory_budget', 'max_nodes') and value != int(value):
+            raise ValueError(f"{name} must be a whole number")
+    deadline = request.get("deadline")
+    if deadline is not None and (not is_number(deadline) or deadline <= 0):
+        raise ValueError("deadline must be a number of seconds above 0")
+    return board, size, engine, heuristic, options, deadline
+
+class ProgressStats(solver.SearchStats):
+    """ Search statistics that also send the bound and node counts to the service after every bound """
+    def __init__(self, connection, job_number):
+        super().__init__()
+        self.connection = connection
+        self.job_number = job_number
+
+    def end_iteration(self, bound, nodes_generated, nodes_expanded):
+        super().end_iteration(bound, nodes_generated, nodes_expanded)
+        self.connection.send(('progress', self.job_number, {
+            "bound": bound,
+            "nodes_generated": nodes_generated,
+            "nodes_expanded": nodes_expanded,
+            "elapsed_seconds": sum(iteration["elapsed_seconds"] for iteration in self.iterations),
+        }))
+
+def worker_main(connection):
+    """ Solve jobs sent over connection until it closes, run in a worker process """
+    # Interrupts are for the service, which stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        number, initial_state, engine, heuristic, options = job
+        try:
+            stats = ProgressStats(connection, number)
+            solution, depth, duration, memory, nodes_expanded = solver.deepening_astar(initial_state, engine, heuristic, stats=stats, **options)
+            record = solver.result_record(initial_state, solution, depth, duration, memory, nodes_expanded, heuristic)
+            record["engine"] = engine
+            if solution is not None:
+                record["optimality_gap"] = len(solution) - stats.lower_bound if stats.lower_bound is not None else 0
+            if stats.counters:
+                record["counters"] = stats.counters
+            connection.send(('result', number, record))
+        except Exception as e:
+            connection.send(('error', number, f"{type(e).__name__}: {e}"))
+
+class Worker:
+    """ A warm worker process and the job it is running """
+    def __init__(self, service):
+        self.service = service
+        self.connection, child = Pipe()
+        self.process = Process(target=worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.job = None
+        asyncio.get_running_loop().add_reader(self.connection.fileno(), self.receive)
+
+    def receive(self):
+        """ Hand every message waiting on the pipe to the service """
+        try:
+            while self.connection.poll():
+                self.service.on_message(self, self.connection.recv())
+        except (EOFError, OSError):
+            self.service.on_worker_exit(self)
+
+    def start(self, job):
+        self.job = job
+        job.worker = self
+        self.connection.send((job.number, job.initial_state, job.engine, job.heuristic, job.options))
+
+    def stop(self):
+        """ Kill the process, stopping any search it is running """
+        asyncio.get_running_loop().remove_reader(self.connection.fileno())
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+class Job:
+    """ One search, shared by every request that submitted the same puzzle and settings """
+    def __init__(self, number, key, initial_state, engine, heuristic, options):
+        self.number = number
+        self.key = key
+        self.initial_state = initial_state
+        self.engine = engine
+        self.heuristic = heuristic
+        self.options = options
+        self.worker = None
+        # Deadline timers by (client, request id) of every request waiting for this job
+        self.subscribers = {}
+
+class Client:
+    """ One connection, with the jobs its requests wait for """
+    def __init__(self, writer):
+        self.writer = writer
+        self.requests = {}
+
+    def send(self, request_id, event, **fields):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps({"id": request_id, "event": event, **fields}) + "\n").encode())
+
+class SolverService:
+    """ Queue of jobs fed to a pool of warm workers, with coalescing, deadlines and cancellation """
+    def __init__(self, workers, cache=None):
+        self.cache = cache
+        self.workers = [Worker(self) for _ in range(workers)]
+        self.queue = deque()
+        # Queued and running jobs by their key, so identical submissions find them
+        self.jobs = {}
+        self.numbers = count(1)
+
+    def submit(self, client, request_id, request):
+        """ Start or join the job for a solve request """
+        if request_id in client.requests:
+            client.send(request_id, "error", message="request id already in use")
+            return
+        # Nothing is queued or cached until the whole request checks out
+        try:
+            board, size, engine, heuristic, options, deadline = parse_request(request)
+        except ValueError as e:
+            client.send(request_id, "error", message=str(e))
+            return
+        initial_state = solver.board_rows(board, size)
+
+        if self.cache is not None and size == 4:
+            solution = self.cache.get(board)
+            if solution is not None:
+                record = solver.result_record(initial_state, solution, len(solution), 0, 0, 0, heuristic)
+                record["optimality_gap"] = 0
+                record["cached"] = True
+                client.send(request_id, "result", record=record)
+                return
+
+        key = (tuple(board), engine, heuristic, tuple(sorted(options.items())))
+        job = self.jobs.get(key)
+        coalesced = job is not None
+        if job is None:
+            job = Job(next(self.numbers), key, initial_state, engine, heuristic, options)
+            self.jobs[key] = job
+            self.queue.append(job)
+        timer = asyncio.get_running_loop().call_later(deadline, self.unsubscribe, job, client, request_id, "deadline") if deadline else None
+        job.subscribers[client, request_id] = timer
+        client.requests[request_id] = job
+        client.send(request_id, "queued", job=job.number, coalesced=coalesced,
+                    position=self.queue.index(job) + 1 if job in self.queue else 0)
+        if job.worker is not None:
+            client.send(request_id, "started", job=job.number)
+        self.dispatch()
+
+    def dispatch(self):
+        """ Start queued jobs on idle workers """
+        for worker in self.workers:
+            if not self.queue:
+                return
+            if worker.job is None:
+                job = self.queue.popleft()
+                worker.start(job)
+                self.broadcast(job, "started")
+
+    def broadcast(self, job, event, **fields):
+        for client, request_id in job.subscribers:
+            client.send(request_id, event, job=job.number, **fields)
+
+    def finish(self, job, event, **fields):
+        """ Send the last event of a job to everyone waiting for it and forget the job """
+        self.broadcast(job, event, **fields)
+        for (client, request_id), timer in job.subscribers.items():
+            if timer:
+                timer.cancel()
+            client.requests.pop(request_id, None)
+        job.subscribers.clear()
+        self.jobs.pop(job.key, None)
+
+    def unsubscribe(self, job, client, request_id, event=None):
+        """ Stop one request waiting for a job, dropping the job once nobody waits for it """
+        timer = job.subscribers.pop((client, request_id), None)
+        if timer:
+            timer.cancel()
+        client.requests.pop(request_id, None)
+        if event:
+            client.send(request_id, event, job=job.number)
+        if job.subscribers:
+            return
+        self.jobs.pop(job.key, None)
+        if job in self.queue:
+            self.queue.remove(job)
+        elif job.worker is not None:
+            self.replace(job.worker)
+        self.dispatch()
+
+    def cancel(self, client, request_id):
+        job = client.requests.get(request_id)
+        if job is None:
+            client.send(request_id, "error", message="no such request")
+            return
+        self.unsubscribe(job, client, request_id, "cancelled")
+
+    def disconnect(self, client):
+        for request_id, job in list(client.requests.items()):
+            self.unsubscribe(job, client, request_id)
+
+    def replace(self, worker):
+        """ Kill a worker, stopping its search, and start a warm one in its place """
+        worker.stop()
+        if worker.job is not None:
+            worker.job.worker = None
+        self.workers[self.workers.index(worker)] = Worker(self)
+
+    def on_message(self, worker, message):
+        kind, number, payload = message
+        job = worker.job
+        # Messages of a job dropped while they were in the pipe
+        if job is None or job.number != number:
+            return
+        if kind == 'progress':
+            self.broadcast(job, "progress", **payload)
+            return
+        worker.job = None
+        job.worker = None
+        if kind == 'result':
+            if self.cache is not None and len(job.initial_state) == 4 and payload["steps"] is not None and not payload["optimality_gap"]:
+                self.cache.put([num for row in job.initial_state for num in row], payload["steps"].split())
+            self.finish(job, "result", record=payload)
+        else:
+            self.finish(job, "error", message=payload)
+        self.dispatch()
+
+    def on_worker_exit(self, worker):
+        job = worker.job
+        if job is not None:
+            self.finish(job, "error", message=f"worker exited with code {worker.process.exitcode}")
+        worker.job = None
+        self.replace(worker)
+        self.dispatch()
+
+    async def handle(self, reader, writer):
+        """ Serve one connection until it closes """
+        client = Client(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    op, request_id = request["op"], request.get("id")
+                except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, AttributeError):
+                    client.send(None, "error", message="requests are JSON objects with an op")
+                    continue
+                # Ids key the client's requests, so they must be hashable
+                if not isinstance(request_id, (str, int, float, type(None))):
+                    client.send(None, "error", message="request ids are strings or numbers")
+                    continue
+                if op == "solve":
+                    self.submit(client, request_id, request)
+                elif op == "cancel":
+                    self.cancel(client, request_id)
+                else:
+                    client.send(request_id, "error", message=f"unknown op {op}")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.disconnect(client)
+            writer.close()
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+
+async def serve(socket_path=DEFAULT_SOCKET, port=None, workers=None, heuristics=('md',), cache_path=None):
+    """ Run the service until interrupted """
+    # Build the heuristics before starting the workers so they inherit the tables
+    for heuristic in heuristics:
+        solver.get_heuristic(heuristic)
+    cache = SolutionCache(cache_path) if cache_path else None
+    service = SolverService(workers or os.cpu_count(), cache)
+    if port:
+        server = await asyncio.start_server(service.handle, '127.0.0.1', port)
+        where = f"127.0.0.1:{port}"
+    else:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = await asyncio.start_unix_server(service.handle, socket_path)
+        where = socket_path
+    print(f"Serving on {where} with {len(service.workers)} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if cache:
+            cache.close()
+        if not port and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+async def request(puzzle, socket_path=DEFAULT_SOCKET, port=None, request_id=1, **fields):
+    """ Submit one puzzle and yield every reply until its last one """
+    if port:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    else:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        writer.write((json.dumps({"op": "solve", "id": request_id, "puzzle": puzzle, **fields}) + "\n").encode())
+        await writer.drain()
+        while line := await reader.readline():
+            reply = json.loads(line)
+            yield reply
+            if reply["event"] in ("result", "error", "cancelled", "deadline"):
+                return
+    finally:
+        writer.close()
+
+async def print_replies(puzzle, socket_path, port, **fields):
+    async for reply in request(puzzle, socket_path, port, **fields):
+        print(json.dumps(reply))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or query a local sliding puzzle solver service")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="Unix socket the service listens on")
+    parser.add_argument('--port', type=int, help="listen on this localhost port instead of the socket")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('serve', help="start the service")
+    run.add_argument('--workers', type=int, default=os.cpu_count(), help="number of warm worker processes")
+    run.add_argument('--heuristics', nargs='+', choices=sorted(solver.HEURISTICS), default=['md', 'md_lc'], help="heuristics loaded before the workers start")
+    run.add_argument('--cache', metavar='FILE', help="answer from and add to this solution cache")
+    solve = commands.add_parser('solve', help="submit one puzzle and print the replies")
+    solve.add_argument('puzzle', help="9, 16 or 25 space separated numbers, 0 for the blank")
+    solve.add_argument('--engine', choices=SERVICE_ENGINES, default='dfs')
+    solve.add_argument('--heuristic', choices=sorted(solver.HEURISTICS), default='md')
+    solve.add_argument('--deadline', type=float, help="seconds before the request gives up")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(args.socket, args.port, args.workers, args.heuristics, args.cache))
+        else:
+            fields = {"engine": args.engine, "heuristic": args.heuristic}
+            if args.deadline:
+                fields["deadline"] = args.deadline
+            asyncio.run(print_replies(args.puzzle, args.socket, args.port, **fields))
+    except KeyboardInterrupt:
+        sys.exit(0)
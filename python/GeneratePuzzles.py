@@ -1,41 +1,180 @@
-import random
-
-def count_inversions(sequence):
-    count = 0
-    size = len(sequence)
-    for i in range(size):
-        for j in range(i + 1, size):
-            if sequence[i] and sequence[j] and sequence[i] > sequence[j]:
-                count += 1
-    return count
-
-def is_solvable(sequence):
-    SIZE = int(len(sequence) ** 0.5)  # Assuming it's a square grid.
-    inversions = count_inversions(sequence)
-    
-    blank_pos = sequence.index(0)
-    row_with_blank = blank_pos // SIZE # count from bottom start at 1
-    
-    if SIZE % 2 == 0:# grid is even width and height
-        # if blank row is even and inversion count is odd or blank row is odd and inversion count is even return True
-        if (row_with_blank % 2 == 0 and inversions % 2 != 0) or (row_with_blank % 2 != 0 and inversions % 2 == 0):
-            return True
-    else: # grid is odd width and height
-        if inversions % 2 ==0:
-            return True
-    return False
-
-def generate_puzzle():
-    sequence = list(range(16))
-    random.shuffle(sequence)
-    return sequence if is_solvable(sequence) else generate_puzzle()
-
-def main(num_puzzles, filename="puzzles.txt"):
+import math
+import argparse
+import numpy as np
+
+# Board width unless another is given, 3 for the 8-puzzle and 5 for the 24-puzzle
+SIZE = 4
+# Puzzles generated per NumPy batch, bounds the temporary arrays
+BATCH_SIZE = 1 << 16
+# Batches in a row without a puzzle in the heuristic range before generation gives up
+MAX_EMPTY_BATCHES = 100
+# Moves of the blank as (row change, column change), in L R D U order so that action ^ 1 undoes action
+MOVES = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+
+def build_neighbours(size=SIZE):
+    """ New blank position for every blank position and move, -1 where the move leaves the board """
+    neighbours = np.full((size * size, len(MOVES)), -1, dtype=np.int64)
+    for pos in range(size * size):
+        row, col = divmod(pos, size)
+        for move, (dx, dy) in enumerate(MOVES):
+            if 0 <= row + dx < size and 0 <= col + dy < size:
+                neighbours[pos, move] = (row + dx) * size + col + dy
+    return neighbours
+
+def build_manhattan_table(size=SIZE):
+    """ Manhattan distance of every tile from its goal at every position, 0 for the blank """
+    table = np.zeros((size * size, size * size), dtype=np.int64)
+    for tile in range(1, size * size):
+        goal_row, goal_col = divmod(tile - 1, size)
+        for pos in range(size * size):
+            row, col = divmod(pos, size)
+            table[tile, pos] = abs(row - goal_row) + abs(col - goal_col)
+    return table
+
+# (neighbours, Manhattan table, goal) by board size, built on first use
+size_tables = {}
+
+def tables(size=SIZE):
+    """ The move and distance tables of a board size """
+    if size not in size_tables:
+        goal = np.array(list(range(1, size * size)) + [0], dtype=np.uint8)
+        size_tables[size] = build_neighbours(size), build_manhattan_table(size), goal
+    return size_tables[size]
+
+def board_size(puzzles):
+    """ Width of the boards in the rows of an (N, size * size) array """
+    return math.isqrt(puzzles.shape[1])
+
+def inversion_parity(puzzles):
+    """ Parity of the inversion count of every row of an (N, cells) array, ignoring the blank
+
+    Each position is compared with the ones after it in turn, so memory stays at a few (N, cells)
+    arrays whatever the board size.
+    """
+    inversions = np.zeros(len(puzzles), dtype=np.int64)
+    for pos in range(puzzles.shape[1] - 1):
+        tile = puzzles[:, pos:pos + 1]
+        later = puzzles[:, pos + 1:]
+        inversions += ((tile > later) & (later != 0)).sum(axis=1)
+    return inversions % 2
+
+def solvable_batch(puzzles):
+    """ is_solvable for every row of an (N, cells) array """
+    size = board_size(puzzles)
+    parity = inversion_parity(puzzles)
+    if size % 2 == 0:
+        blank_row = np.argmax(puzzles == 0, axis=1) // size
+        return (parity + blank_row) % 2 == 1
+    return parity == 0
+
+def random_batch(count, rng, size=SIZE):
+    """ Uniformly random solvable puzzles
+
+    Swapping two tiles flips the inversion parity and leaves the blank alone, so swapping the first two
+    tiles of every unsolvable permutation pairs it with exactly one solvable one and no draw is wasted.
+    """
+    puzzles = rng.permuted(np.tile(np.arange(size * size, dtype=np.uint8), (count, 1)), axis=1)
+    rows = np.nonzero(~solvable_batch(puzzles))[0]
+    blank = np.argmax(puzzles[rows] == 0, axis=1)
+    first = np.where(blank == 0, 1, 0)
+    second = np.where(blank <= 1, 2, 1)
+    puzzles[rows, first], puzzles[rows, second] = puzzles[rows, second], puzzles[rows, first]
+    return puzzles
+
+def walk_batch(count, rng, min_steps, max_steps, size=SIZE):
+    """ Puzzles made by walking the blank from the goal for min_steps to max_steps moves without stepping straight back
+
+    The walk length is an upper bound on the optimal solution length.
+    """
+    neighbour_table, _, goal = tables(size)
+    puzzles = np.tile(goal, (count, 1))
+    blanks = np.full(count, size * size - 1)
+    previous = np.full(count, -1)
+    lengths = rng.integers(min_steps, max_steps + 1, count)
+    rows = np.arange(count)
+    for step in range(max_steps):
+        neighbours = neighbour_table[blanks]
+        allowed = (neighbours >= 0) & (np.arange(len(MOVES)) != (previous ^ 1)[:, None])
+        # Pick uniformly among the allowed moves
+        move = np.argmax(rng.random((count, len(MOVES))) * allowed, axis=1)
+        moving = rows[step < lengths]
+        new_blanks = neighbours[moving, move[moving]]
+        puzzles[moving, blanks[moving]] = puzzles[moving, new_blanks]
+        puzzles[moving, new_blanks] = 0
+        blanks[moving] = new_blanks
+        previous[moving] = move[moving]
+    return puzzles
+
+def manhattan_batch(puzzles):
+    """ Manhattan distance heuristic of every row of an (N, cells) array """
+    manhattan = tables(board_size(puzzles))[1]
+    return manhattan[puzzles, np.arange(puzzles.shape[1])].sum(axis=1)
+
+def check_heuristic_range(heuristic_range, mode='random', walk_length=(20, 80), size=SIZE):
+    """ Raise ValueError for a heuristic range no generated puzzle can fall in """
+    low, high = heuristic_range
+    if low > high:
+        raise ValueError(f"heuristic range {low} to {high} is empty")
+    # No board is further from the goal than every tile at its furthest position
+    most = int(tables(size)[1].max(axis=1).sum())
+    # Every move changes the Manhattan distance by one, so a walk ends at most its length away
+    if mode == 'walk':
+        most = min(most, walk_length[1])
+    if low > most:
+        raise ValueError(f"heuristic range {low} to {high} is out of reach, {mode} puzzles of size {size} are at most {most} away")
+
+def generate(count, mode='random', seed=None, walk_length=(20, 80), heuristic_range=None, size=SIZE):
+    """ Arrays of solvable puzzles to iterate over, count in total, each at most BATCH_SIZE rows
+
+    heuristic_range keeps only puzzles whose Manhattan distance lies within the inclusive (low, high) range.
+    Raises ValueError up front for a range no puzzle can fall in, and while iterating once MAX_EMPTY_BATCHES
+    batches in a row had none in it.
+    """
+    if heuristic_range is not None:
+        check_heuristic_range(heuristic_range, mode, walk_length, size)
+    return generate_batches(count, mode, seed, walk_length, heuristic_range, size)
+
+def generate_batches(count, mode, seed, walk_length, heuristic_range, size):
+    """ Yield the batches of generate """
+    rng = np.random.default_rng(seed)
+    empty_batches = 0
+    while count > 0:
+        if mode == 'walk':
+            puzzles = walk_batch(BATCH_SIZE, rng, *walk_length, size)
+        else:
+            puzzles = random_batch(BATCH_SIZE, rng, size)
+        if heuristic_range is not None:
+            h = manhattan_batch(puzzles)
+            puzzles = puzzles[(h >= heuristic_range[0]) & (h <= heuristic_range[1])]
+            empty_batches = 0 if len(puzzles) else empty_batches + 1
+            if empty_batches == MAX_EMPTY_BATCHES:
+                raise ValueError(f"no puzzle in heuristic range {heuristic_range[0]} to {heuristic_range[1]} "
+                                 f"in {MAX_EMPTY_BATCHES * BATCH_SIZE} tries, {count} still missing")
+        puzzles = puzzles[:count]
+        count -= len(puzzles)
+        yield puzzles
+
+def main(num_puzzles, filename="puzzles.txt", mode='random', seed=None, walk_length=(20, 80), heuristic_range=None, size=SIZE):
+    batches = generate(num_puzzles, mode, seed, walk_length, heuristic_range, size)
+    if filename.endswith('.npy'):
+        # Binary output, an (N, size * size) uint8 array
+        np.save(filename, np.concatenate(list(batches)))
+        return
     with open(filename, 'w') as file:
-        for _ in range(num_puzzles):
-            puzzle = generate_puzzle()
-            file.write(' '.join(map(str, puzzle)) + '\n')
+        for puzzles in batches:
+            np.savetxt(file, puzzles, fmt='%d')
 
 if __name__ == '__main__':
-    NUM_PUZZLES = 500  # Change this to the desired number
-    main(NUM_PUZZLES)
+    parser = argparse.ArgumentParser(description="Generate solvable sliding puzzles in the puzzles.txt format, or .npy for binary")
+    parser.add_argument('--size', type=int, default=SIZE, help="board width, 3 for the 8-puzzle, 4 for the 15-puzzle and 5 for the 24-puzzle")
+    parser.add_argument('--count', type=int, default=500, help="number of puzzles")
+    parser.add_argument('--output', default='puzzles.txt', help="output file, written as a uint8 array when it ends in .npy")
+    parser.add_argument('--mode', choices=['random', 'walk'], default='random', help="uniform random puzzles or random walks from the goal")
+    parser.add_argument('--walk-length', type=int, nargs=2, default=(20, 80), metavar=('MIN', 'MAX'), help="range of random walk lengths")
+    parser.add_argument('--heuristic-range', type=int, nargs=2, metavar=('MIN', 'MAX'), help="keep puzzles whose Manhattan distance is in this range")
+    parser.add_argument('--seed', type=int, help="seed for reproducible output")
+    args = parser.parse_args()
+    try:
+        main(args.count, args.output, args.mode, args.seed, tuple(args.walk_length), args.heuristic_range, args.size)
+    except ValueError as e:
+        parser.error(str(e))
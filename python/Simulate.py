@@ -1,5 +1,7 @@
 import sys
+import argparse
 import pygame
+from validate import load_records
 
 # Initialize pygame
 pygame.init()
@@ -39,6 +41,50 @@ class Puzzle:
                 pygame.draw.rect(screen, (0, 0, 0), (j * 100, i * 100, 100, 100), 1)
 
 
+def animate(puzzle, moves, frames):
+    """ Play moves on the puzzle, showing every move for frames frames at 30 frames per second """
+    # Set up the display
+    screen = pygame.display.set_mode((400, 400))
+    pygame.display.set_caption('15 Puzzle Game')
+
+    # Main game loop
+    clock = pygame.time.Clock()
+    for move in moves:
+        puzzle.move(move)
+        for _ in range(frames):  # Number of frames per move
+            screen.fill((0, 0, 0))
+            puzzle.draw(screen)
+            pygame.display.flip()
+            clock.tick(30)  # Frames per second
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+
+def load_record(path, number=None, configuration=None):
+    """ (initial state, moves) of the record with a configuration, or of the numbered record counting from 1 """
+    records = [record for record in load_records(path) if record[1] is not None]
+    if configuration is not None:
+        matches = [record for record in records if record[0].split() == configuration.split()]
+        if not matches:
+            sys.exit(f"No solved record of {configuration} in {path}")
+        record = matches[0]
+    else:
+        if not 1 <= number <= len(records):
+            sys.exit(f"{path} has {len(records)} solved records")
+        record = records[number - 1]
+    numbers = [int(num) for num in record[0].split()]
+    if len(numbers) != 16:
+        sys.exit(f"{record[0]} is not a 15-puzzle, the only board this animation draws")
+    return [numbers[i:i+4] for i in range(0, 16, 4)], record[1].split()
+
+parser = argparse.ArgumentParser(description="Animate a 15-puzzle solution, the built in example unless a results file is given")
+parser.add_argument('results', nargs='?', help="MD.json style records, solutions.json or a .jsonl stream")
+parser.add_argument('--record', type=int, default=1, help="number of the solved record to play, counting from 1")
+parser.add_argument('--configuration', help="play the record of this puzzle instead, 16 space separated numbers")
+parser.add_argument('--frames', type=int, default=30, help="frames every move is shown for")
+args = parser.parse_args()
+
 # Define initial state
 initial_state = [
     [7, 5, 2, 13],
@@ -47,29 +93,16 @@ initial_state = [
     [4, 15, 14, 9]
 ]
 
-# Create a puzzle object
-puzzle = Puzzle(initial_state)
-
 # Define moves
 moves = "U L D R D L U L U L D R D R D L L U R D R R U U L U L D D D R U L D L U R D R U U L D R R U L U R D L L U R D D L U R R D D".split()
 
-# Set up the display
-screen = pygame.display.set_mode((400, 400))
-pygame.display.set_caption('15 Puzzle Game')
+if args.results:
+    initial_state, moves = load_record(args.results, args.record, args.configuration)
+
+# Create a puzzle object
+puzzle = Puzzle(initial_state)
 
-# Main game loop
-clock = pygame.time.Clock()
-for move in moves:
-    puzzle.move(move)
-    for _ in range(30):  # Number of frames per move
-        screen.fill((0, 0, 0))
-        puzzle.draw(screen)
-        pygame.display.flip()
-        clock.tick(30)  # Frames per second
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+animate(puzzle, moves, args.frames)
 
 # Quit pygame
 pygame.quit()
@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+from multiprocessing import Pool
+import matplotlib
+# Charts are only ever saved, so render without a display
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+import pandas as pd
+"""Loads result sets in the MD.json format through a binary cache, summarizes them and renders their charts headless
+in parallel. compare.py and plot.py are thin command lines over this module."""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from ResultStore import read_json_lines
+# Parsed result sets are cached here, one .npz per source file
+CACHE_DIRECTORY = os.path.join(ROOT, '.cache')
+# Layout of the cache files, part of the stamp of every cache file so older ones are parsed again
+CACHE_VERSION = 2
+# Numeric fields of a record kept in the cache
+METRICS = ('time_taken_ms', 'nodes_expanded', 'max_search_depth')
+PERCENTILES = (50, 90, 99)
+# Readable names for the result files shipped with the repo
+LABELS = {'MD': 'Manhattan Distance', 'MD_LC': 'Manhattan + Linear Conflict'}
+COLORS = ['skyblue', 'lightcoral', 'lightgreen', 'plum', 'khaki', 'lightsalmon', 'lightsteelblue', 'wheat']
+
+class ResultSet:
+    """ Numeric columns of one result file, with each puzzle keyed by its tiles as a byte string """
+    def __init__(self, path, label=None):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.label = label or LABELS.get(self.name, self.name)
+        self.columns = load_columns(path)
+        self.state = self.columns['state']
+
+    def __len__(self):
+        return len(self.state)
+
+    def __getitem__(self, metric):
+        return self.columns[metric]
+
+def load_result_sets(paths, labels=()):
+    """ Result sets of paths labelled in order, names and labels shared by several files are made unique
+
+    Summaries are keyed by label and single charts are named after the file, so files of one name in different
+    directories are told apart by their directory, and numbered when that is shared too.
+    """
+    labels = list(labels) + [None] * (len(paths) - len(labels))
+    result_sets = [ResultSet(path, label) for path, label in zip(paths, labels)]
+    for attribute, prefixed, numbered in (('name', '{}_{}', '{}_{}'), ('label', '{}/{}', '{} ({})')):
+        values = [getattr(result_set, attribute) for result_set in result_sets]
+        for result_set, value in zip(result_sets, values):
+            if values.count(value) > 1:
+                directory = os.path.basename(os.path.dirname(os.path.abspath(result_set.path)))
+                setattr(result_set, attribute, prefixed.format(directory, value))
+        values = [getattr(result_set, attribute) for result_set in result_sets]
+        for index, (result_set, value) in enumerate(zip(result_sets, values)):
+            if values.count(value) > 1:
+                setattr(result_set, attribute, numbered.format(value, index + 1))
+    return result_sets
+
+def read_records(path):
+    """ Records of a JSON list or a JSON lines stream, skipping the partial last line a killed run leaves """
+    if path.endswith('.jsonl'):
+        return list(read_json_lines(path, lambda number: print(f"Warning: skipped unreadable line {number} of {path}")))
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def parse_columns(path):
+    """ Columns of every record with all metrics present, states as the tiles of every board, one byte each
+
+    Boards of every size may share a file. Smaller boards are padded with zero bytes, and since a board
+    has one blank the padding never makes two boards equal.
+    """
+    records = [record for record in read_records(path) if all(record.get(metric) is not None for metric in METRICS)]
+    boards = [record['configuration'].split() for record in records]
+    cells = max(map(len, boards), default=1)
+    tiles = np.zeros((len(boards), cells), dtype=np.uint8)
+    # One array per board size, as rows of equal length
+    for size in {len(board) for board in boards}:
+        rows = [i for i, board in enumerate(boards) if len(board) == size]
+        tiles[rows, :size] = np.array([boards[i] for i in rows], dtype=np.uint8)
+    columns = {'state': tiles.view(np.dtype((np.bytes_, cells)))[:, 0]}
+    for metric in METRICS:
+        columns[metric] = np.array([record[metric] for record in records], dtype=np.int64)
+    return columns
+
+def cache_path(path):
+    """ Cache file of a result file, named after its absolute path so equal names in other directories do not collide """
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIRECTORY, f"{os.path.basename(path)}-{digest}.npz")
+
+def load_columns(path):
+    """ Columns of a result file, parsed again only when the file's size or modification time changed """
+    status = os.stat(path)
+    source = np.array([status.st_size, status.st_mtime_ns, CACHE_VERSION], dtype=np.int64)
+    cached = cache_path(path)
+    if os.path.exists(cached):
+        with np.load(cached) as data:
+            if np.array_equal(data['source'], source):
+                return {key: data[key] for key in data.files if key != 'source'}
+    columns = parse_columns(path)
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    # Write then rename so a concurrent run never reads half a cache file
+    temporary = cached + '.tmp.npz'
+    np.savez(temporary, source=source, **columns)
+    os.replace(temporary, cached)
+    return columns
+
+def summarize(result_sets):
+    """ Percentiles of every metric per result set, and speedups of each set over the first on the puzzles they share """
+    summary = {}
+    base = result_sets[0]
+    for result_set in result_sets:
+        values = np.stack([result_set[metric] for metric in METRICS]).astype(np.float64)
+        entry = {"puzzles": len(result_set)}
+        if len(result_set):
+            percentiles = np.percentile(values, PERCENTILES, axis=1)
+            means, maxima = values.mean(axis=1), values.max(axis=1)
+            for i, metric in enumerate(METRICS):
+                entry[metric] = {"mean": float(means[i]), "max": float(maxima[i]),
+                                 **{f"p{q}": float(percentiles[j, i]) for j, q in enumerate(PERCENTILES)}}
+        if result_set is not base:
+            entry["speedup"] = speedup(base, result_set)
+        summary[result_set.label] = entry
+    return summary
+
+def speedup(base, other):
+    """ Ratios of base over other time and nodes on the puzzles both solved, above 1 when other is faster """
+    _, base_index, other_index = np.intersect1d(base.state, other.state, return_indices=True)
+    ratios = {"shared_puzzles": len(base_index)}
+    if not len(base_index):
+        return ratios
+    for metric in ('time_taken_ms', 'nodes_expanded'):
+        # Sub-millisecond solves are logged as 0 ms
+        before = np.maximum(base[metric][base_index], 1).astype(np.float64)
+        after = np.maximum(other[metric][other_index], 1).astype(np.float64)
+        ratio = before / after
+        ratios[metric] = {"total": float(before.sum() / after.sum()), "median": float(np.median(ratio)),
+                          "geometric_mean": float(np.exp(np.log(ratio).mean()))}
+    return ratios
+
+def format_summary(summary):
+    """ Summary as printable lines """
+    lines = []
+    for label, entry in summary.items():
+        lines.append(f"{label}: {entry['puzzles']} puzzles")
+        for metric in METRICS:
+            if metric in entry:
+                stats = entry[metric]
+                lines.append(f"  {metric}: mean {stats['mean']:.1f}, " + ", ".join(f"p{q} {stats[f'p{q}']:.0f}" for q in PERCENTILES) +
+                             f", max {stats['max']:.0f}")
+        for metric, ratios in entry.get("speedup", {}).items():
+            if metric != "shared_puzzles":
+                lines.append(f"  {metric} speedup over {next(iter(summary))}: total {ratios['total']:.2f}x, "
+                             f"median {ratios['median']:.2f}x, geometric mean {ratios['geometric_mean']:.2f}x")
+    return lines
+
+def frame(result_sets):
+    """ One DataFrame of every result set, labelled by implementation """
+    frames = []
+    for result_set in result_sets:
+        df = pd.DataFrame({metric: result_set[metric] for metric in METRICS})
+        df['implementation'] = result_set.label
+        frames.append(df)
+    return pd.concat(frames)
+
+def draw_time_box(ax, result_sets):
+    # Side-by-Side Box Plot for Time Taken
+    sns.boxplot(x='implementation', y='time_taken_ms', hue='implementation', data=frame(result_sets), palette='pastel', legend=False, ax=ax)
+    ax.set_yscale('log')
+    ax.set_title('Side-by-Side Box Plot for Time Taken')
+    ax.set_xlabel('Implementation')
+    ax.set_ylabel('Time Taken (ms)')
+
+def draw_depth_kde(ax, result_sets):
+    # Overlayed Kernel Density Estimation for Max Search Depth
+    for result_set, color in zip(result_sets, COLORS * len(result_sets)):
+        sns.kdeplot(result_set['max_search_depth'], fill=True, color=color, ax=ax, label=result_set.label)
+    ax.set_title('Overlayed KDE for Max Search Depth')
+    ax.set_xlabel('Max Search Depth')
+    ax.set_ylabel('Density')
+    ax.legend()
+
+def draw_nodes_bar(ax, result_sets):
+    # Aggregate Bar Graph for Nodes Expanded
+    average_nodes_expanded = pd.DataFrame({'implementation': [result_set.label for result_set in result_sets],
+                                           'nodes_expanded': [result_set['nodes_expanded'].mean() for result_set in result_sets]})
+    sns.barplot(x='implementation', y='nodes_expanded', hue='implementation', data=average_nodes_expanded, palette='pastel', legend=False, ax=ax)
+    ax.set_title('Aggregate Bar Graph for Average Nodes Expanded')
+    ax.set_xlabel('Implementation')
+    ax.set_ylabel('Average Nodes Expanded')
+
+def draw_depth_histogram(ax, result_set):
+    # Histogram for Max Search Depth
+    sns.histplot(result_set['max_search_depth'], kde=False, bins=20, color='skyblue', ax=ax)
+    ax.set_title(f'Histogram for Max Search Depth\n{result_set.label}')
+    ax.set_xlabel('Max Search Depth')
+    ax.set_ylabel('Frequency')
+
+def draw_time_box_single(ax, result_set):
+    # Box Plot for Time Taken
+    sns.boxplot(x=result_set['time_taken_ms'], color='lightgreen', ax=ax)
+    ax.set_xscale('log')
+    ax.set_yscale('linear')
+    ax.set_title(f'Box Plot for Time Taken\n{result_set.label}')
+    ax.set_xlabel('Time Taken (ms)')
+
+def draw_nodes_density(ax, result_set):
+    # Density Plot for Nodes Expanded
+    sns.kdeplot(result_set['nodes_expanded'], fill=True, color='lightcoral', ax=ax)
+    ax.set_xscale("log")
+    ax.set_yscale("linear")
+    ax.set_title(f'Density Plot for Nodes Expanded\n{result_set.label}')
+    ax.set_xlabel('Nodes Expanded')
+    ax.set_ylabel('Density')
+
+# Charts comparing every result set, by file name
+COMPARISON_CHARTS = {
+    'BoxPlot_TimeTaken.png': draw_time_box,
+    'KDE_MaxSearchDepth.png': draw_depth_kde,
+    'BarGraph_NodesExpanded.png': draw_nodes_bar,
+}
+# Charts of one result set, the file name gets the set's name filled in
+SINGLE_CHARTS = {
+    'Histogram_Max_Search_Depth_{}.png': draw_depth_histogram,
+    'Box_Plot_Time_Taken_{}.png': draw_time_box_single,
+    'Density_Plot_Nodes_Expanded_{}.png': draw_nodes_density,
+}
+
+def draw_comparison_figure(path, result_sets):
+    """ Every comparison chart side by side in one figure """
+    fig = plt.figure(figsize=(15, 10))
+    labels = [result_set.label for result_set in result_sets]
+    fig.suptitle("Comparison between " + (", ".join(labels[:-1]) + " and " + labels[-1] if len(labels) > 1 else labels[0]))
+    for position, draw in enumerate(COMPARISON_CHARTS.values()):
+        draw(fig.add_subplot(2, 3, position + 1), result_sets)
+    # Adjust the layout
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    fig.subplots_adjust(bottom=0.2)
+    fig.savefig(path)
+    plt.close(fig)
+
+worker_result_sets = None
+
+def set_worker_result_sets(result_sets):
+    """ Pool initializer handing every worker the result sets once instead of with every chart """
+    global worker_result_sets
+    worker_result_sets = result_sets
+
+def render_chart(task):
+    """ Render one chart to a file, run in a worker process """
+    path, chart, index = task
+    if chart == 'comparison':
+        draw_comparison_figure(path, worker_result_sets)
+        return path
+    draw = COMPARISON_CHARTS.get(chart) or SINGLE_CHARTS[chart]
+    fig, ax = plt.subplots(figsize=(5, 4))
+    fig.subplots_adjust(bottom=0.2)
+    draw(ax, worker_result_sets if index is None else worker_result_sets[index])
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+def chart_tasks(result_sets, output, comparison=True, single=True):
+    """ (file, chart, result set index) for every chart to render, the index is None for charts of all sets """
+    tasks = []
+    if comparison:
+        tasks += [(os.path.join(output, name), name, None) for name in COMPARISON_CHARTS]
+        tasks.append((os.path.join(output, 'Comparison_Plot.png'), 'comparison', None))
+    if single:
+        tasks += [(os.path.join(output, name.format(result_set.name)), name, index)
+                  for index, result_set in enumerate(result_sets) for name in SINGLE_CHARTS]
+    return tasks
+
+def render(result_sets, output='.', comparison=True, single=True, workers=None):
+    """ Render charts into output in parallel, returning the files written """
+    os.makedirs(output, exist_ok=True)
+    tasks = chart_tasks(result_sets, output, comparison, single)
+    if workers == 1:
+        set_worker_result_sets(result_sets)
+        return [render_chart(task) for task in tasks]
+    with Pool(workers, initializer=set_worker_result_sets, initargs=(result_sets,)) as pool:
+        return pool.map(render_chart, tasks)
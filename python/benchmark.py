@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import argparse
+import importlib
+import resource
+from multiprocessing import Pipe, Process
+"""Solves fixed tiers of benchmark puzzles with every chosen heuristic and engine, writes one record per
+puzzle in the MD.json format read by compare.py plus benchmark fields, and diffs the totals against a
+stored baseline. Exits with status 1 when any total regresses by more than the threshold or any
+puzzle fails to finish.
+
+The korf100 tier reads benchmarks/korf100.txt, Korf's 100 instances one per line as published, with
+the blank first in the goal. They are rotated 180 degrees onto this solver's goal, which turns an
+optimal solution of the original into an optimal solution of the rotated board. Their optimal
+solutions average 53 moves, so the tier is only run when asked for and is meant for the pattern
+database heuristics, with the Manhattan heuristics the hardest instances take hours each.
+
+The smoke8 tier holds 8-puzzles that finish in moments, and stress24 holds 24-puzzles made by random
+walks short enough to solve with the Manhattan heuristics. Pattern databases are only built for the
+15-puzzle, so they skip both.
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+solver = importlib.import_module('15PuzzleSolver')
+
+BENCHMARK_DIRECTORY = os.path.join(ROOT, 'benchmarks')
+# Puzzle files of every tier, easy and medium are subsets of puzzles.txt picked by nodes_expanded in MD.json
+TIERS = {
+    'easy': os.path.join(BENCHMARK_DIRECTORY, 'easy.txt'),
+    'medium': os.path.join(BENCHMARK_DIRECTORY, 'medium.txt'),
+    'korf100': os.path.join(BENCHMARK_DIRECTORY, 'korf100.txt'),
+    'smoke8': os.path.join(BENCHMARK_DIRECTORY, 'smoke8.txt'),
+    'stress24': os.path.join(BENCHMARK_DIRECTORY, 'stress24.txt'),
+}
+# Board width of every tier that is not a 15-puzzle tier
+TIER_SIZES = {'smoke8': 3, 'stress24': 5}
+
+def read_korf_instances(filename):
+    """ Read Korf's instances, with or without their leading instance number, rotated onto this solver's goal """
+    puzzles = []
+    with open(filename, 'r') as f:
+        for line in f:
+            numbers = list(map(int, line.split()))
+            if len(numbers) == 17:
+                numbers = numbers[1:]
+            if len(numbers) != 16:
+                continue
+            board = [16 - tile if tile else 0 for tile in reversed(numbers)]
+            puzzles.append(solver.board_rows(board))
+    return puzzles
+
+def read_tier(tier):
+    """ Puzzles of a tier, or None when its file is missing """
+    filename = TIERS[tier]
+    if not os.path.exists(filename):
+        return None
+    if tier == 'korf100':
+        return read_korf_instances(filename)
+    return solver.read_puzzles_from_file(filename, TIER_SIZES.get(tier, 4))
+
+def run_puzzle(task, sender):
+    """ Solve one benchmark puzzle and send back its record, run in a fresh process """
+    tier, engine, heuristic, initial = task
+    solution, depth, duration, memory, nodes_expanded = solver.deepening_astar(initial, engine, heuristic)
+    record = solver.result_record(initial, solution, depth, duration, memory, nodes_expanded, heuristic)
+    record["tier"] = tier
+    record["engine"] = engine
+    record["nodes_per_sec"] = nodes_expanded / duration if duration else 0.0
+    # ru_maxrss is in kilobytes on Linux
+    record["peak_memory_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    sender.send(record)
+
+def measure(task):
+    """ Run one benchmark puzzle in its own process so the peak memory belongs to that puzzle alone
+
+    Returns None when the process dies before sending its record.
+    """
+    receiver, sender = Pipe(duplex=False)
+    process = Process(target=run_puzzle, args=(task, sender))
+    process.start()
+    # Only the child holds the sending end now, so the receiver sees EOF if it dies
+    sender.close()
+    try:
+        record = receiver.recv()
+    except EOFError:
+        record = None
+    process.join()
+    if record is None:
+        tier, engine, heuristic, initial = task
+        print(f"Failed {tier}/{heuristic}/{engine} on {initial}, exit code {process.exitcode}")
+    return record
+
+def summarize(records):
+    """ Totals per tier, heuristic and engine """
+    summary = {}
+    for record in records:
+        key = f"{record['tier']}/{record['heuristic']}/{record['engine']}"
+        totals = summary.setdefault(key, {"puzzles": 0, "nodes_expanded": 0, "time_taken_ms": 0, "peak_memory_bytes": 0})
+        totals["puzzles"] += 1
+        totals["nodes_expanded"] += record["nodes_expanded"]
+        totals["time_taken_ms"] += record["time_taken_ms"]
+        totals["peak_memory_bytes"] = max(totals["peak_memory_bytes"], record["peak_memory_bytes"])
+    for totals in summary.values():
+        totals["nodes_per_sec"] = totals["nodes_expanded"] * 1000 / totals["time_taken_ms"] if totals["time_taken_ms"] else 0.0
+    return summary
+
+def find_regressions(summary, baseline, threshold):
+    """ Totals that got worse than the baseline by more than threshold, as a fraction """
+    regressions = []
+    for key, totals in summary.items():
+        if key not in baseline or totals["puzzles"] != baseline[key]["puzzles"]:
+            continue
+        base = baseline[key]
+        # Larger is worse for these
+        for field in ("time_taken_ms", "nodes_expanded", "peak_memory_bytes"):
+            if base[field] and totals[field] > base[field] * (1 + threshold):
+                regressions.append((key, field, base[field], totals[field]))
+        # Smaller is worse for throughput
+        if totals["nodes_per_sec"] < base["nodes_per_sec"] * (1 - threshold):
+            regressions.append((key, "nodes_per_sec", base["nodes_per_sec"], totals["nodes_per_sec"]))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sliding puzzle solver and check it against a baseline")
+    parser.add_argument('--tiers', nargs='+', choices=sorted(TIERS), default=['easy', 'medium'],
+                        help="tiers to run, korf100 is slow and best run with --heuristics pdb663")
+    parser.add_argument('--heuristics', nargs='+', choices=sorted(solver.HEURISTICS), default=['md', 'md_lc'])
+    parser.add_argument('--engines', nargs='+', choices=sorted(solver.ENGINES), default=['dfs'])
+    parser.add_argument('--output', default='benchmark.json', help="file the per puzzle records are written to")
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIRECTORY, 'baseline.json'), help="records of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1, help="allowed fractional slowdown before a total counts as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    # Build every heuristic's tables once so each puzzle process inherits them
+    for heuristic in args.heuristics:
+        solver.get_heuristic(heuristic)
+
+    records = []
+    failures = 0
+    for tier in args.tiers:
+        puzzles = read_tier(tier)
+        if puzzles is None:
+            print(f"Skipping tier {tier}, {TIERS[tier]} not found")
+            continue
+        for heuristic in args.heuristics:
+            if heuristic.startswith('pdb') and TIER_SIZES.get(tier, 4) != 4:
+                print(f"Skipping {tier}/{heuristic}, pattern databases are only built for the 15-puzzle")
+                continue
+            for engine in args.engines:
+                for initial in puzzles:
+                    record = measure((tier, engine, heuristic, initial))
+                    if record is None:
+                        failures += 1
+                    else:
+                        records.append(record)
+                print(f"Finished {tier}/{heuristic}/{engine}")
+
+    with open(args.output, 'w') as f:
+        json.dump(records, f, indent=4)
+
+    summary = summarize(records)
+    for key, totals in summary.items():
+        print(f"{key}: {totals['puzzles']} puzzles, {totals['nodes_expanded']} nodes, {totals['time_taken_ms']} ms, "
+              f"{totals['nodes_per_sec']:.0f} nodes/sec, peak {totals['peak_memory_bytes']} bytes")
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = summarize(json.load(f))
+        regressions = find_regressions(summary, baseline, args.threshold)
+        for key, field, before, after in regressions:
+            print(f"Regression in {key} {field}: {before:.0f} -> {after:.0f}")
+        if not regressions:
+            print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+
+    # A run with failed puzzles would make every later comparison skip their totals
+    if args.save_baseline and not failures:
+        with open(args.baseline, 'w') as f:
+            json.dump(records, f, indent=4)
+
+    if failures:
+        print(f"{failures} puzzles failed to finish")
+    sys.exit(1 if regressions or failures else 0)
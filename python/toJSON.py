@@ -1,61 +1,269 @@
+import os
+import re
 import sys
 import json
-import re
-"""Takes two command line arguments [formatted-solutions.txt] and [path to save JSON] and converts the regular formatted text file to JSON and saves it at the designated location"""
-# Check if correct number of command line arguments are provided
-if len(sys.argv) != 3:
-    print("Usage: python script_name.py input_file_path output_file_path")
-    sys.exit(1)
-
-# Fetch the input and output file paths from command line arguments
-input_file_path = sys.argv[1]
-output_file_path = sys.argv[2]
-
-# Initialize the list to store the puzzles
-puzzles = []
-
-# Read the input file and parse the content
-try:
-    with open(input_file_path, 'r') as file:
-        lines = file.readlines()
-
-    puzzle = {}
-    for line in lines:
-        # Find the puzzle configuration
-        if line.startswith("Solving puzzle"):
-            match = re.match(r"Solving puzzle \d+: ([\d\s]+)", line.strip())
-            if match:
-                configuration = match.group(1)
-                puzzle = {"configuration": configuration.strip()}
-        
-        # Find the path and steps
-        elif line.startswith("Path found with steps:"):
-            steps = line[len("Path found with steps: "):].strip()
-            puzzle["steps"] = steps
-        
-        # Find the max search depth reached for the puzzle
-        elif line.startswith("Max search depth reached for puzzle"):
-            match = re.match(r"Max search depth reached for puzzle \d+: (\d+)", line.strip())
-            if match:
-                max_search_depth = int(match.group(1))
-                puzzle["max_search_depth"] = max_search_depth
-        
-        # Find the time taken
-        elif line.startswith("Time taken"):
-            match = re.match(r"Time taken (\d+) ms", line.strip())
-            if match:
-                time_taken = int(match.group(1))
-                puzzle["time_taken_ms"] = time_taken
-        elif line.startswith("Nodes expanded"):
-            match = re.match(r"Nodes expanded (\d+)", line.strip())
-            if match:
-                nodes_expanded = int(match.group(1))
-                puzzle["nodes_expanded"] = nodes_expanded
-                puzzles.append(puzzle)
-
-    # Save the parsed content to the output file in JSON format
-    with open(output_file_path, 'w') as file:
-        json.dump(puzzles, file, indent=4)
-
-except Exception as e:
-    print(f"Error: {e}")
+import math
+import shutil
+import zipfile
+import argparse
+import tempfile
+import textwrap
+import numpy as np
+from collections import deque
+from multiprocessing import Pool, cpu_count
+"""Takes a solver log [formatted-solutions.txt] and a [path to save] and converts the regular formatted text file to
+records in the MD.json format. Records are written as they are parsed: a JSON list by default, one record per line when
+the path ends in .jsonl, or numeric columns when it ends in .npz. Large logs are split at "Solving puzzle" lines and the
+pieces are parsed in parallel. Malformed records are reported and skipped."""
+
+HEADER = b"Solving puzzle"
+# Bytes of log parsed by one worker at a time, bounds the memory held per piece
+CHUNK_SIZE = 8 << 20
+# Pieces parsed or waiting to be written per worker, bounds how far the workers read ahead of the writer
+IN_FLIGHT = 2
+# Records a ColumnWriter holds before appending them to its column files
+COLUMN_CHUNK = 1 << 16
+# Every field a complete record has, in the order the solver logs them
+FIELDS = ("configuration", "steps", "max_search_depth", "time_taken_ms", "nodes_expanded")
+
+def is_board(tiles):
+    """ Whether tiles, as strings of digits, hold the numbers 0 to n - 1 of a square board of n cells """
+    size = math.isqrt(len(tiles))
+    return size >= 2 and size * size == len(tiles) and sorted(map(int, tiles)) == list(range(len(tiles)))
+
+def parse_line(line, puzzle):
+    """ Add the field on one log line to puzzle, raising ValueError when the line does not parse """
+    # Find the path and steps
+    if line.startswith("Path found with steps:"):
+        puzzle["steps"] = line[len("Path found with steps: "):].strip()
+        return
+    # Find the max search depth reached for the puzzle, the time taken and the nodes expanded
+    for prefix, pattern, field in (
+        ("Max search depth reached for puzzle", r"Max search depth reached for puzzle \d+: (\d+)$", "max_search_depth"),
+        ("Time taken", r"Time taken (\d+) ms$", "time_taken_ms"),
+        ("Nodes expanded", r"Nodes expanded (\d+)$", "nodes_expanded"),
+    ):
+        if line.startswith(prefix):
+            match = re.match(pattern, line.strip())
+            if not match:
+                raise ValueError(f"unreadable line {line.strip()!r}")
+            puzzle[field] = int(match.group(1))
+            return
+
+def parse_range(path, start, end):
+    """ Yield (record, error) pairs for the puzzles whose "Solving puzzle" line lies between two byte offsets
+
+    Exactly one of the pair is set, error names the puzzle and byte offset of a record that was skipped.
+    """
+    puzzle, number, offset, problem = None, None, start, None
+
+    def finish():
+        if puzzle is None:
+            return None
+        missing = [field for field in FIELDS if field not in puzzle]
+        reason = problem or (f"missing {', '.join(missing)}" if missing else None)
+        if reason:
+            return None, f"puzzle {number} at byte {offset}: {reason}"
+        return puzzle, None
+
+    with open(path, 'rb') as file:
+        file.seek(start)
+        position = start
+        while position < end:
+            raw = file.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8', errors='replace')
+            # Find the puzzle configuration, which starts the next record
+            if raw.startswith(HEADER):
+                result = finish()
+                if result:
+                    yield result
+                offset = position
+                match = re.match(r"Solving puzzle (\d+): ([\d\s]+)$", line.strip())
+                number = match.group(1) if match else "?"
+                problem = None if match and is_board(match.group(2).split()) else f"unreadable line {line.strip()!r}"
+                puzzle = {"configuration": match.group(2).strip()} if match else {}
+            elif puzzle is not None and problem is None:
+                try:
+                    parse_line(line, puzzle)
+                except ValueError as e:
+                    problem = str(e)
+            position += len(raw)
+    result = finish()
+    if result:
+        yield result
+
+def parse_chunk(task):
+    """ Every (record, error) pair of one piece of log, run in a worker """
+    return list(parse_range(*task))
+
+def chunk_boundaries(path, chunk_size=CHUNK_SIZE):
+    """ Byte offsets splitting a log into pieces of about chunk_size bytes, each starting on a "Solving puzzle" line """
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as file:
+        for guess in range(chunk_size, size, chunk_size):
+            if guess <= boundaries[-1]:
+                continue
+            file.seek(guess)
+            # Skip the rest of the line the guess landed in, then look for the next record
+            file.readline()
+            while True:
+                position = file.tell()
+                line = file.readline()
+                if not line:
+                    position = size
+                    break
+                if line.startswith(HEADER):
+                    break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return boundaries
+
+def parse_log(path, workers=None, chunk_size=CHUNK_SIZE):
+    """ Yield the (record, error) pairs of a whole log in order, holding at most IN_FLIGHT pieces per worker in memory """
+    boundaries = chunk_boundaries(path, chunk_size)
+    tasks = [(path, start, end) for start, end in zip(boundaries, boundaries[1:])]
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield from parse_range(*task)
+        return
+    workers = workers or cpu_count()
+    with Pool(workers) as pool:
+        # Pool.imap reads ahead without limit, so pieces are only submitted as earlier ones are consumed
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(parse_chunk, (task,)))
+            if len(pending) >= IN_FLIGHT * workers:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+class JSONWriter:
+    """ Writes records as one JSON list, laid out like json.dump(records, indent=4) """
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, record):
+        self.file.write(",\n" if self.count else "[\n")
+        self.file.write(textwrap.indent(json.dumps(record, indent=4), "    "))
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+
+class JSONLinesWriter:
+    """ Writes one record per line """
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        pass
+
+class ColumnWriter:
+    """ Writes records as numeric columns of an .npz, steps as a string column
+
+    Records are appended to one temporary file per column every COLUMN_CHUNK records and copied into the archive on
+    close, so memory stays bounded however long the log is. The board width is taken from the first record.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.cells = None
+        self.count = 0
+        self.longest_steps = 1
+        self.pending = []
+        self.columns = {field: tempfile.TemporaryFile() for field in FIELDS}
+
+    def write(self, record):
+        cells = len(record["configuration"].split())
+        if self.cells is None:
+            self.cells = cells
+        elif cells != self.cells:
+            raise ValueError(f"board of {cells} tiles among boards of {self.cells}")
+        self.pending.append(record)
+        if len(self.pending) >= COLUMN_CHUNK:
+            self.flush()
+
+    def flush(self):
+        """ Append the pending records to the column files """
+        if not self.pending:
+            return
+        boards = " ".join(record["configuration"] for record in self.pending)
+        self.columns["configuration"].write(np.array(boards.split(), dtype=np.uint8).tobytes())
+        steps = [record["steps"] for record in self.pending]
+        self.columns["steps"].write(("\n".join(steps) + "\n").encode())
+        self.longest_steps = max(self.longest_steps, max(map(len, steps)))
+        for field in FIELDS[2:]:
+            self.columns[field].write(np.array([record[field] for record in self.pending], dtype=np.int64).tobytes())
+        self.count += len(self.pending)
+        self.pending = []
+
+    def copy_column(self, archive, field, dtype, shape, convert=None):
+        """ Stream one column file into the archive as a .npy entry, as np.savez names them """
+        source = self.columns[field]
+        source.seek(0)
+        with archive.open(field + '.npy', 'w', force_zip64=True) as entry:
+            np.lib.format.write_array_header_1_0(entry, {
+                'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': shape})
+            if convert is None:
+                shutil.copyfileobj(source, entry)
+                return
+            while lines := source.readlines(CHUNK_SIZE):
+                entry.write(convert(lines))
+
+    def close(self):
+        self.flush()
+        steps_type = np.dtype(f'U{self.longest_steps}')
+        with zipfile.ZipFile(self.file, 'w', allowZip64=True) as archive:
+            self.copy_column(archive, "configuration", np.dtype(np.uint8), (self.count, self.cells or 0))
+            self.copy_column(archive, "steps", steps_type, (self.count,),
+                             lambda lines: np.array([line[:-1].decode() for line in lines], dtype=steps_type).tobytes())
+            for field in FIELDS[2:]:
+                self.copy_column(archive, field, np.dtype(np.int64), (self.count,))
+        for column in self.columns.values():
+            column.close()
+
+def open_writer(file, path):
+    """ Writer for the output format chosen by the path's extension """
+    if path.endswith('.jsonl'):
+        return JSONLinesWriter(file)
+    if path.endswith('.npz'):
+        return ColumnWriter(file)
+    return JSONWriter(file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a solver log to JSON, JSON lines or columnar records")
+    parser.add_argument('input_file_path', help="solver log such as ManhattanDistance.txt")
+    parser.add_argument('output_file_path', help="file to save, .jsonl for JSON lines, .npz for columns, otherwise a JSON list")
+    parser.add_argument('--workers', type=int, default=cpu_count(), help="processes parsing pieces of the log")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE >> 20, help="size in MB of the pieces of log parsed at once")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_file_path):
+        print(f"Error: {args.input_file_path} not found")
+        sys.exit(1)
+
+    parsed, skipped = 0, 0
+    with open(args.output_file_path, 'wb' if args.output_file_path.endswith('.npz') else 'w') as file:
+        writer = open_writer(file, args.output_file_path)
+        for record, error in parse_log(args.input_file_path, args.workers, args.chunk_size << 20):
+            if error:
+                print(f"Skipping malformed record, {error}", file=sys.stderr)
+                skipped += 1
+                continue
+            try:
+                writer.write(record)
+            except ValueError as e:
+                print(f"Skipping record, {e}", file=sys.stderr)
+                skipped += 1
+                continue
+            parsed += 1
+        writer.close()
+    print(f"Wrote {parsed} records to {args.output_file_path}, skipped {skipped}")
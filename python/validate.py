@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import math
+import argparse
+import numpy as np
+from time import time
+"""Replays solutions from result files all at once with NumPy and reports the ones that do not hold up.
+
+Reads MD.json style records, solutions.json and the solver's .jsonl streams. Moves follow Puzzle.move
+in Simulate.py: the blank moves, and a move that would leave the board is skipped, here also reported
+as illegal. Records that end away from the goal are reported, and so are puzzles whose solutions
+differ in length between files or heuristics, a sign one of them is not optimal. Solutions the weighted
+and anytime engines left short of proven optimal are not compared."""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from ResultStore import read_json_lines
+
+# Move codes in the solver's L R D U order, then the padding after a solution ends and anything unreadable
+MOVE_CODES = {'L': 0, 'R': 1, 'D': 2, 'U': 3}
+PADDING = 4
+UNKNOWN = 5
+MOVE_NAMES = 'LRDU'
+# Tile of the boards of narrower widths where length_mismatches pads them, no board holds it
+NO_TILE = 255
+
+def build_move_table(size):
+    """ New blank position for every blank position and move code, -1 where the move is illegal, padding stays put """
+    table = np.full((size * size, UNKNOWN + 1), -1, dtype=np.int64)
+    for pos in range(size * size):
+        row, col = divmod(pos, size)
+        for name, (dx, dy) in zip(MOVE_NAMES, [(0, -1), (0, 1), (1, 0), (-1, 0)]):
+            if 0 <= row + dx < size and 0 <= col + dy < size:
+                table[pos, MOVE_CODES[name]] = (row + dx) * size + col + dy
+        table[pos, PADDING] = pos
+    return table
+
+def build_code_table():
+    """ Move code of every byte, UNKNOWN for bytes that are not a move """
+    table = np.full(256, UNKNOWN, dtype=np.uint8)
+    for name, code in MOVE_CODES.items():
+        table[ord(name)] = code
+    return table
+
+CODE_TABLE = build_code_table()
+# Move tables by board width, built on first use
+move_tables = {}
+
+def get_move_table(size):
+    """ The move table of a board width, built on first use """
+    if size not in move_tables:
+        move_tables[size] = build_move_table(size)
+    return move_tables[size]
+
+def load_records(path):
+    """ (configuration, steps, heuristic, optimality gap) of every record in a results file, steps None when it has no solution
+
+    Configurations and steps are space separated strings as in MD.json. Records of the optimal engines
+    have a gap of 0.
+    """
+    if path.endswith('.jsonl'):
+        data = list(read_json_lines(path, lambda number: print(f"Warning: skipped unreadable line {number} of {path}")))
+    else:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    records = []
+    # solutions.json maps "Puzzle N" to entries with the board as a list
+    if isinstance(data, dict):
+        for entry in data.values():
+            steps = entry.get("Solution Steps")
+            records.append((' '.join(str(num) for num in entry["Initial State"]),
+                            ' '.join(steps) if steps is not None else None, None, 0))
+        return records
+    for record in data:
+        records.append((record["configuration"], record.get("steps"), record.get("heuristic"), record.get("optimality_gap") or 0))
+    return records
+
+def tokenize(texts):
+    """ (bytes, token starts, token ends, tokens in every string) of whitespace separated strings, ends exclusive
+
+    The strings are joined by newlines, which they cannot hold as single lines of a results file, and
+    anything outside ASCII becomes '?' so every character stays one byte.
+    """
+    data = np.frombuffer('\n'.join(texts).encode('ascii', 'replace'), dtype=np.uint8)
+    # Mark word characters, padded with a space on both sides so every token has a start and an end
+    word = np.concatenate(([False], data > ord(' '), [False]))
+    changes = np.flatnonzero(word[1:] != word[:-1])
+    starts, ends = changes[::2], changes[1::2]
+    # Tokens before every joining newline, and so before the end of every string
+    before = np.searchsorted(starts, np.append(np.flatnonzero(data == ord('\n')), len(data)))
+    return data, starts, ends, np.diff(before, prepend=0)
+
+def tile_counts(records):
+    """ Number of tiles on the board of every record """
+    return tokenize([configuration for configuration, *_ in records])[3]
+
+def encode(records, cells):
+    """ (N, cells) boards, (N, longest) move codes padded with PADDING and solution lengths of records with a solution
+
+    Every board must hold cells tiles. Both columns are tokenized in one pass over their joined bytes rather than
+    split record by record.
+    """
+    data, starts, ends, _ = tokenize([configuration for configuration, *_ in records])
+    # Tiles have at most two digits, a token of one digit has its last byte in the tens place
+    tens = np.where(ends - starts == 2, data[starts] - ord('0'), 0)
+    boards = (tens * 10 + data[ends - 1] - ord('0')).astype(np.uint8).reshape(-1, cells)
+    data, starts, ends, lengths = tokenize([steps for _, steps, *_ in records])
+    # Moves are single letters, longer tokens are unreadable
+    codes = CODE_TABLE[data[starts]]
+    codes[ends - starts != 1] = UNKNOWN
+    moves = np.full((len(records), lengths.max(initial=0)), PADDING, dtype=np.uint8)
+    # Masked assignment fills rows in order, which is the order of the tokens
+    moves[np.arange(moves.shape[1]) < lengths[:, None]] = codes
+    return boards, moves, lengths
+
+def replay_batch(boards, moves, lengths, size):
+    """ Replay every row of moves on its board of width size, returning the final boards and the step of each first illegal
+    move, -1 for none
+
+    Rows are replayed longest first so every step only touches the rows still moving.
+    """
+    order = np.argsort(-lengths, kind='stable')
+    boards = boards[order].copy()
+    moves = moves[order]
+    # Boards and the move table are indexed flat, one offset per cell instead of a row and a column
+    flat = boards.reshape(-1)
+    offsets = np.arange(len(boards)) * boards.shape[1]
+    move_table = get_move_table(size).reshape(-1)
+    blanks = np.argmax(boards == 0, axis=1)
+    illegal = np.full(len(boards), -1, dtype=np.int64)
+    # Rows still moving at every step, a prefix since rows are sorted by length
+    moving = np.searchsorted(-lengths[order], -np.arange(moves.shape[1]), side='left')
+    for step in range(moves.shape[1]):
+        count = moving[step]
+        blank = blanks[:count]
+        target = move_table[blank * (UNKNOWN + 1) + moves[:count, step]]
+        bad = target < 0
+        # Illegal moves are skipped as Puzzle.move does, the rows are only filtered when there are any
+        if bad.any():
+            illegal[:count][bad & (illegal[:count] < 0)] = step
+            rows = np.flatnonzero(~bad)
+            blank, target = blank[rows], target[rows]
+        else:
+            rows = slice(count)
+        flat[offsets[rows] + blank] = flat[offsets[rows] + target]
+        flat[offsets[rows] + target] = 0
+        # Last, blank may be a view of blanks
+        blanks[rows] = target
+    final = np.empty_like(boards)
+    final[order] = boards
+    first_illegal = np.empty_like(illegal)
+    first_illegal[order] = illegal
+    return final, first_illegal
+
+def validate(result_files):
+    """ Replay every solution in result_files, returning the report and the number of solutions replayed """
+    report = {"illegal_moves": [], "not_solved": [], "length_mismatches": [], "unreadable_boards": [], "unsolved_records": 0}
+    # (path, records, boards, lengths) of the solutions proven optimal that replayed cleanly, of every file
+    proven = []
+    replayed = 0
+    for path in result_files:
+        records = load_records(path)
+        solved = [record for record in records if record[1] is not None]
+        report["unsolved_records"] += len(records) - len(solved)
+        if not solved:
+            continue
+        # Boards of every width are replayed apart, each on its own move table and against its own goal
+        counts = tile_counts(solved)
+        for cells in np.unique(counts):
+            group = [solved[i] for i in np.flatnonzero(counts == cells)]
+            size = math.isqrt(cells)
+            if size < 2 or size * size != cells:
+                report["unreadable_boards"] += [{"file": path, "configuration": record[0]} for record in group]
+                continue
+            boards, moves, lengths = encode(group, cells)
+            final, first_illegal = replay_batch(boards, moves, lengths, size)
+            replayed += len(group)
+            goal = (final == np.array(list(range(1, cells)) + [0], dtype=np.uint8)).all(axis=1)
+            for i in np.flatnonzero(first_illegal >= 0):
+                step = int(first_illegal[i])
+                report["illegal_moves"].append({"file": path, "configuration": group[i][0], "step": step,
+                                                "move": group[i][1].split()[step]})
+            for i in np.flatnonzero(~goal):
+                report["not_solved"].append({"file": path, "configuration": group[i][0],
+                                             "final": ' '.join(str(num) for num in final[i])})
+            gaps = np.fromiter((record[3] for record in group), dtype=np.float64, count=len(group))
+            rows = np.flatnonzero(goal & (first_illegal < 0) & (gaps == 0))
+            proven.append((path, [group[i] for i in rows], boards[rows], lengths[rows]))
+    report["length_mismatches"] = length_mismatches(proven)
+    return report, replayed
+
+def length_mismatches(proven):
+    """ Puzzles whose solutions differ in length between variants, a variant being a file and heuristic
+
+    Only puzzles whose shortest and longest solutions differ are gone through record by record.
+    """
+    if not proven:
+        return []
+    # Narrower boards are padded to the widest so boards of every width are numbered together
+    width = max(boards.shape[1] for _, _, boards, _ in proven)
+    boards = np.concatenate([np.pad(boards, ((0, 0), (0, width - boards.shape[1])), constant_values=NO_TILE)
+                             for _, _, boards, _ in proven])
+    lengths = np.concatenate([lengths for _, _, _, lengths in proven])
+    # Number every distinct board through a view of each row as one opaque value
+    keys = np.ascontiguousarray(boards).view(np.dtype((np.void, boards.shape[1])))[:, 0]
+    _, puzzle = np.unique(keys, return_inverse=True)
+    shortest = np.full(puzzle.max() + 1, lengths.max())
+    longest = np.zeros(puzzle.max() + 1, dtype=lengths.dtype)
+    np.minimum.at(shortest, puzzle, lengths)
+    np.maximum.at(longest, puzzle, lengths)
+    differing = (shortest != longest)[puzzle]
+    # Solution lengths of every such puzzle by variant, a later record of a variant replacing an earlier one
+    lengths_by_puzzle = {}
+    start = 0
+    for path, records, _, _ in proven:
+        for i in np.flatnonzero(differing[start:start + len(records)]):
+            configuration, _, heuristic, _ = records[i]
+            variant = f"{path} ({heuristic})" if heuristic else path
+            lengths_by_puzzle.setdefault(configuration, {})[variant] = int(lengths[start + i])
+        start += len(records)
+    return [{"configuration": configuration, "lengths": variants}
+            for configuration, variants in lengths_by_puzzle.items() if len(set(variants.values())) > 1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay and check every solution in result files")
+    parser.add_argument('files', nargs='*', help="MD.json style records, solutions.json or .jsonl streams, MD.json and MD_LC.json by default")
+    parser.add_argument('--output', help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    files = args.files or [os.path.join(root, 'MD.json'), os.path.join(root, 'MD_LC.json')]
+    start_time = time()
+    report, replayed = validate(files)
+    duration = time() - start_time
+    print(f"Replayed {replayed} solutions in {duration:.2f} seconds ({replayed / max(duration, 1e-9):.0f} per second)")
+    for problem in report["illegal_moves"]:
+        print(f"Illegal move {problem['move']} at step {problem['step']} of {problem['configuration']} in {problem['file']}")
+    for problem in report["not_solved"]:
+        print(f"{problem['configuration']} in {problem['file']} ends at {problem['final']}")
+    for problem in report["unreadable_boards"]:
+        print(f"{problem['configuration']} in {problem['file']} is not a square board")
+    for problem in report["length_mismatches"]:
+        print(f"{problem['configuration']} has solutions of different lengths: " +
+              ", ".join(f"{length} in {variant}" for variant, length in problem["lengths"].items()))
+    if report["unsolved_records"]:
+        print(f"{report['unsolved_records']} records have no solution")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    sys.exit(1 if report["illegal_moves"] or report["not_solved"] or report["length_mismatches"] or report["unreadable_boards"] else 0)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The solver modules live at the repository root, and the solver's file name is not a valid identifier
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
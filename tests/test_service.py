@@ -0,0 +1,20 @@
+import pytest
+from SolverService import ENGINE_OPTIONS, SERVICE_ENGINES, SERVICE_OPTIONS, parse_request
+
+PUZZLE = [15, 4, 3, 8, 1, 5, 12, 2, 0, 7, 11, 13, 10, 14, 9, 6]
+# A valid value of every option
+VALUES = {'pruning': 'parent', 'node_budget': 1000, 'memory_budget': 1 << 20, 'weight': 1.5, 'time_limit': 5, 'max_nodes': 1000}
+
+def test_every_service_engine_has_an_option_table():
+    assert set(ENGINE_OPTIONS) == set(SERVICE_ENGINES)
+    assert set(VALUES) == set(SERVICE_OPTIONS)
+
+@pytest.mark.parametrize('engine', SERVICE_ENGINES)
+def test_engine_options_are_checked_per_engine(engine):
+    for name, value in VALUES.items():
+        request = {"puzzle": PUZZLE, "engine": engine, "options": {name: value}}
+        if name in ENGINE_OPTIONS[engine]:
+            assert parse_request(request)[4] == {name: value}
+        else:
+            with pytest.raises(ValueError, match=name):
+                parse_request(request)
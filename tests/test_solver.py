@@ -0,0 +1,29 @@
+import importlib
+
+solver = importlib.import_module('15PuzzleSolver')
+
+# A 15-puzzle taking eight bounds with md_lc, small enough to solve in a few seconds
+BOARD = [15, 4, 3, 8, 1, 5, 12, 2, 0, 7, 11, 13, 10, 14, 9, 6]
+
+def bound_counts(stats):
+    return [(iteration["bound"], iteration["nodes_generated"], iteration["nodes_expanded"]) for iteration in stats.iterations]
+
+def test_parallel_counts_match_dfs_per_bound():
+    heuristic = solver.get_heuristic('md_lc')
+    initial_state = solver.board_rows(BOARD)
+    dfs_stats = solver.SearchStats()
+    solver.depth_first_astar(initial_state, heuristic, stats=dfs_stats)
+    for split_depth in (1, 2, 4):
+        parallel_stats = solver.SearchStats()
+        solver.parallel_astar(initial_state, heuristic, workers=1, split_depth=split_depth, stats=parallel_stats)
+        # The solving bound stops at a different point, every earlier bound is searched in full
+        assert bound_counts(parallel_stats)[:-1] == bound_counts(dfs_stats)[:-1]
+
+def test_weighted_bounds_record_branching_factors():
+    # Weighted bounds can grow by a small fraction, which must not overflow the per unit branching factor
+    stats = solver.SearchStats()
+    solution = solver.deepening_astar(solver.board_rows(BOARD, 4), 'weighted', 'md_lc', stats=stats, weight=1.3)[0]
+    assert solution
+    steps = [iteration["bound"] - previous["bound"] for previous, iteration in zip(stats.iterations, stats.iterations[1:])]
+    assert any(step < 1 for step in steps)
+    assert all(iteration["branching_factor"] is None or iteration["branching_factor"] > 0 for iteration in stats.iterations)